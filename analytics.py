@@ -0,0 +1,155 @@
+# analytics.py
+from datetime import date, timedelta
+import numpy as np
+from models import HabitEntry, db
+
+# Vectorized aggregates over many habits at once. Completions are loaded with a
+# single query into a (habits x days) 0/1 matrix; everything else is array math.
+
+
+def load_completion_matrix(habit_ids, start: date, end: date):
+    """Completions of the given habits between start and end (inclusive).
+
+    Returns a uint8 array of shape (len(habit_ids), days) where [i, d] is 1 when
+    habit_ids[i] was completed on start + d days.
+    """
+    days = (end - start).days + 1
+    matrix = np.zeros((len(habit_ids), days), dtype=np.uint8)
+    if not habit_ids:
+        return matrix
+
+    # Core (not ORM) select: no per-row entity overhead
+    connection = db.session.connection()
+    table = HabitEntry.__table__
+    if connection.dialect.name == 'sqlite':
+        # Day offset computed by SQLite, so no date objects are built at all
+        day = db.cast(db.func.julianday(table.c.completion_date) - db.func.julianday(start.isoformat()), db.Integer)
+    else:
+        day = table.c.completion_date
+    rows = connection.execute(
+        db.select(table.c.habit_id, day)
+          .where(table.c.habit_id.in_(habit_ids),
+                 table.c.completion_date >= start,
+                 table.c.completion_date <= end)
+    ).all()
+    if not rows:
+        return matrix
+
+    index_of = {habit_id: i for i, habit_id in enumerate(habit_ids)}
+    habit_index = np.fromiter((index_of[r[0]] for r in rows), dtype=np.intp, count=len(rows))
+    if connection.dialect.name == 'sqlite':
+        offsets = np.fromiter((r[1] for r in rows), dtype=np.intp, count=len(rows))
+    else:
+        # Day ordinals are much cheaper to convert than date objects
+        offsets = np.fromiter((r[1].toordinal() for r in rows), dtype=np.intp, count=len(rows)) - start.toordinal()
+    matrix[habit_index, offsets] = 1
+    return matrix
+
+
+def due_matrix(frequency_types, start: date, days: int, first_days=None):
+    """How much of a completion each habit owes per day: 1 (daily), 1 on weekdays, 1/7 (weekly).
+
+    first_days[i] is the day offset from which habit i owes anything (days before
+    it existed owe nothing); None: the whole window.
+    """
+    day_numbers = np.arange(days)
+    weekdays = (day_numbers + start.weekday()) % 7 # Monday=0
+    due = np.ones((len(frequency_types), days), dtype=np.float64)
+    for i, frequency_type in enumerate(frequency_types):
+        if frequency_type == 'daily_weekdays':
+            due[i] = weekdays < 5
+        elif frequency_type == 'weekly':
+            due[i] = 1 / 7
+    if first_days is not None:
+        due[day_numbers[np.newaxis, :] < np.asarray(first_days, dtype=np.intp)[:, np.newaxis]] = 0
+    return due
+
+
+def rolling_sum(values, window: int):
+    """Sum over the trailing `window` days (fewer at the start), along the last axis."""
+    cumulative = np.cumsum(values, axis=-1, dtype=np.float64)
+    shifted = np.zeros_like(cumulative)
+    shifted[..., window:] = cumulative[..., :-window]
+    return cumulative - shifted
+
+
+def compute_analytics(matrix, frequency_types, start: date, window: int = 30, created_on=None):
+    """Rolling completion rates, weekday heatmaps, weekly/monthly totals and the contribution grid.
+
+    created_on (local dates, like frequency_types) keeps the days before each habit
+    existed out of the rates, unless it was completed (backfilled) on them.
+    """
+    habits, days = matrix.shape
+    day_numbers = np.arange(days)
+    weekdays = (day_numbers + start.weekday()) % 7
+    calendar = np.datetime64(start, 'D') + day_numbers
+
+    # Contribution grid: completions per day across all habits
+    per_day = matrix.sum(axis=0, dtype=np.int64)
+
+    # Day-of-week heatmap (Monday first): matrix @ one-hot(weekday)
+    weekday_onehot = np.zeros((days, 7), dtype=np.int64)
+    weekday_onehot[day_numbers, weekdays] = 1
+    heatmap = matrix.astype(np.int64) @ weekday_onehot
+
+    # Per ISO week and per calendar month totals
+    week_index = (day_numbers + start.weekday()) // 7
+    weekly = np.bincount(week_index, weights=per_day).astype(np.int64)
+    first_monday = np.datetime64(start - timedelta(days=start.weekday()), 'D')
+    months = calendar.astype('datetime64[M]')
+    month_keys, month_index = np.unique(months, return_inverse=True)
+    monthly = np.bincount(month_index, weights=per_day).astype(np.int64)
+
+    # Rolling completion rate: completions / owed completions over the trailing window
+    first_days = None
+    if created_on is not None:
+        created = np.fromiter(((d - start).days for d in created_on), dtype=np.intp, count=habits)
+        first_done = np.where(matrix.any(axis=1), matrix.argmax(axis=1), days)
+        first_days = np.minimum(created, first_done)
+    due = due_matrix(frequency_types, start, days, first_days)
+    done = rolling_sum(matrix, window)
+    owed = rolling_sum(due, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_habit_rate = np.where(owed > 0, np.minimum(done / owed, 1.0), 0.0)
+        overall_rate = np.where(owed.sum(axis=0) > 0,
+                                np.minimum(done.sum(axis=0) / owed.sum(axis=0), 1.0), 0.0)
+        period_rate = np.where(due.sum(axis=1) > 0,
+                               np.minimum(matrix.sum(axis=1) / due.sum(axis=1), 1.0), 0.0)
+
+    return {
+        "grid": per_day.tolist(),
+        "weekday_heatmap": {
+            "overall": heatmap.sum(axis=0).tolist(),
+            "per_habit": heatmap.tolist(),
+        },
+        "weekly_totals": [
+            {"week_start": str(first_monday + 7 * i), "count": int(count)} for i, count in enumerate(weekly)
+        ],
+        "monthly_totals": {str(key): int(count) for key, count in zip(month_keys, monthly)},
+        "rolling_rate": {
+            "window": window,
+            "overall": np.round(overall_rate, 4).tolist(),
+            "current": np.round(per_habit_rate[:, -1], 4).tolist() if days else [0.0] * habits,
+        },
+        "completion_rate": np.round(period_rate, 4).tolist(),
+    }
+
+
+def habit_analytics(habits, start: date, end: date, window: int = 30, per_habit_grids: bool = False,
+                    created_on=None):
+    """Analytics for a list of Habit rows over [start, end], arrays ordered like `habits`.
+
+    created_on: each habit's creation as a local date (see compute_analytics).
+    """
+    habit_ids = [h.id for h in habits]
+    matrix = load_completion_matrix(habit_ids, start, end)
+    result = compute_analytics(matrix, [h.frequency_type for h in habits], start, window, created_on)
+    if per_habit_grids:
+        # One "0101..." string per habit, a character per day
+        result["habit_grids"] = [row.tobytes().decode('ascii') for row in matrix + ord('0')]
+    result.update({
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "habits": [{"id": h.id, "name": h.name, "frequency_type": h.frequency_type} for h in habits],
+    })
+    return result
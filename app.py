@@ -1,37 +1,122 @@
 # app.py
-from flask import Flask, request, jsonify, render_template # Added render_template
+from flask import (Blueprint, Flask, Response, abort, current_app, redirect, request, jsonify, render_template, # Added render_template
+                   stream_with_context, url_for)
 from flask_sqlalchemy import SQLAlchemy
-from datetime import date, timedelta
-from models import db, Habit, HabitEntry # Use relative import if structure allows
-from services import get_habit_status_for_day, calculate_streaks # Use relative import
+from datetime import date, datetime, timedelta
+from models import db, Habit, HabitEntry, HabitStats # Use relative import if structure allows
+from services import (user_habits, get_user_habit, get_habit_statuses_for_day, get_stats_summary, record_completion, record_uncompletion,
+                      get_completion_bitmaps, month_bounds, insert_completions, bulk_complete,
+                      get_data_version, bump_data_version, get_changes_since) # Use relative import
+from frequency import FREQUENCY_RULES
+from database import configure_database, install_sqlite_pragmas
+from instrumentation import init_instrumentation
+from caching import conditional_json, init_response_cache
+from events import Broadcaster, format_event, stream
+from clock import local_date, local_today
+from auth import TOKEN_COOKIE, authenticate, current_user_id, user_id_for_token
+from assets import init_assets
+import transfer
+try:
+    import analytics # Needs NumPy
+except ImportError:
+    analytics = None
+import csv
+import io
 import os 
 
-app = Flask(__name__)
-# Configure database connection (SQLite)
-# --- Change to Absolute Path ---
 basedir = os.path.abspath(os.path.dirname(__file__)) # Gets the directory where app.py is located
 instance_path = os.path.join(basedir, 'instance') # Path to the instance folder
-# Ensure the instance directory exists before configuring the URI
-os.makedirs(instance_path, exist_ok=True)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(instance_path, 'habits.db')
-# -----------------------------
 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+bp = Blueprint('habits', __name__) # Every route below; registered by create_app()
 
-# Initialize extensions
-db.init_app(app)
 
-# Create database tables if they don't exist
-with app.app_context():
-    db.create_all()
+def create_app(config=None):
+    """Application factory. config (a dict) overrides the defaults and the environment.
+
+    Doesn't touch the schema: run `python manage.py upgrade-db` once before starting
+    workers (see README), so each worker starts without DDL.
+    """
+    app = Flask(__name__)
+    # Ensure the instance directory exists before configuring the URI
+    os.makedirs(instance_path, exist_ok=True)
+    configure_database(app, instance_path) # URI, pool and SQLite pragma profile (see database.py)
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['MAX_HISTORY_WINDOW_DAYS'] = 366 # Largest from/to window the stats endpoint will serve
+    app.config['MAX_BULK_COMPLETIONS'] = 5000 # Items accepted per POST /api/completions
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 256)) # Cached GET responses (LRU)
+    app.config['SSE_MAX_CLIENTS'] = int(os.environ.get('SSE_MAX_CLIENTS', 100)) # Concurrent /api/events streams per process
+    app.config['SSE_QUEUE_SIZE'] = 100 # Pending events per client before it is dropped
+    app.config['TIMEZONE'] = os.environ.get('TIMEZONE') # Default IANA timezone for "today" (unset: server local time)
+    app.config['ARCHIVE_GRACE_DAYS'] = int(os.environ.get('ARCHIVE_GRACE_DAYS', 30)) # Deleted habits kept live this long
+    app.config['SINGLE_USER'] = os.environ.get('SINGLE_USER') # User name that requests without a token act as
+    app.config.from_prefixed_env() # Any other setting as FLASK_<KEY>, e.g. FLASK_MAX_BULK_COMPLETIONS=1000
+    if config:
+        app.config.update(config)
+
+    # Initialize extensions
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(app, db.engine) # WAL, synchronous=NORMAL, cache, mmap, busy timeout
+        init_instrumentation(app, db.engine) # Opt-in SQL timing, Server-Timing headers and /api/_metrics
+
+    init_response_cache(app) # ETag/304 + cached bodies for the read endpoints, keyed by data version
+    # Live updates for /api/events
+    app.extensions['broadcaster'] = Broadcaster(app.config['SSE_MAX_CLIENTS'], app.config['SSE_QUEUE_SIZE'])
+    init_assets(app) # Fingerprinted, precompressed JS/CSS (see `manage.py build-assets`)
+    app.register_blueprint(bp)
+    return app
+
+
+def get_broadcaster() -> Broadcaster:
+    return current_app.extensions['broadcaster']
+
+
+# --- Authentication ---
+
+PUBLIC_ENDPOINTS = {'habits.login'}
+
+
+@bp.before_request
+def require_user():
+    """Every route acts for the authenticated user; API calls get 401, pages go to /login."""
+    if request.endpoint in PUBLIC_ENDPOINTS or authenticate() is not None:
+        return None
+    if request.path.startswith('/api/'):
+        return jsonify({"error": "Authentication required"}), 401
+    return redirect(url_for('habits.login'))
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Token login for the HTML pages: stores the token in an HttpOnly cookie."""
+    error = None
+    if request.method == 'POST':
+        token = request.form.get('token', '').strip()
+        if user_id_for_token(token) is not None:
+            response = redirect(url_for('habits.index'))
+            response.set_cookie(TOKEN_COOKIE, token, max_age=365 * 24 * 3600, httponly=True, samesite='Lax',
+                                secure=request.is_secure)
+            return response
+        error = "Unknown token"
+    return render_template('login.html', error=error), 401 if error else 200
+
+
+@bp.route('/logout', methods=['POST'])
+def logout():
+    response = redirect(url_for('habits.login'))
+    response.delete_cookie(TOKEN_COOKIE)
+    return response
+
 
 # --- API Routes ---
 
-@app.route('/api/habits', methods=['GET'])
+@bp.route('/api/habits', methods=['GET'])
+@conditional_json(get_data_version)
 def get_habits():
     """Get all active habits, categorized."""
-    habits = Habit.query.filter_by(is_deleted=False).order_by(Habit.created_at.desc()).all()
-    today = date.today()
+    habits = user_habits(current_user_id()).filter_by(is_deleted=False).order_by(Habit.created_at.desc()).all()
+    today = local_today()
 
     categorized_habits = {
         "done_today": [],
@@ -40,31 +125,116 @@ def get_habits():
         "not_applicable_today": [] # For habits not relevant today (e.g. weekday habit on weekend)
     }
 
-    for habit in habits:
-        status = get_habit_status_for_day(habit, today)
-        habit_data = {
-            "id": habit.id,
-            "name": habit.name,
-            "frequency_type": habit.frequency_type,
-            # Add completion count for today/this week if needed for display
-            "completed_today": status == "done_today", # Boolean flag
-        }
-        if status == "done_today":
-             categorized_habits["done_today"].append(habit_data)
-        elif status == "done_this_week":
-             categorized_habits["done_this_week"].append(habit_data)
-        elif status == "pending":
-             categorized_habits["pending"].append(habit_data)
-        else: # 'not_applicable_today'
-             categorized_habits["not_applicable_today"].append(habit_data)
+    # One grouped query for every habit instead of one or two per habit
+    statuses = get_habit_statuses_for_day(habits, today)
 
+    for habit in habits:
+        status = statuses[habit.id]
+        categorized_habits[status].append(habit_data(habit, status))
 
     # Mimic the screenshot sorting: Pending first, then Done Today/Week
     # The client-side will likely handle the final display order
+    categorized_habits["version"] = get_data_version(current_user_id()) # Starting point for /api/habits/changes
     return jsonify(categorized_habits)
 
 
-@app.route('/api/habits', methods=['POST'])
+def habit_data(habit: Habit, status: str):
+    """List entry for a habit, as in GET /api/habits."""
+    return {
+        "id": habit.id,
+        "name": habit.name,
+        "frequency_type": habit.frequency_type,
+        # Add completion count for today/this week if needed for display
+        "completed_today": status == "done_today", # Boolean flag
+    }
+
+
+def habit_delta(habit: Habit, status: str, today: date):
+    """A habit's new status bucket and stats, for clients to patch their list with."""
+    if habit.is_deleted:
+        return {"id": habit.id, "status": "deleted"}
+    summary = get_stats_summary(habit, today)
+    return dict(habit_data(habit, status),
+                status=status,
+                current_streak=summary["current_streak"],
+                best_streak=summary["best_streak"],
+                goals_met=summary["total_completions"])
+
+
+def habit_deltas(habits, today: date):
+    """habit_delta for several habits with one status query."""
+    statuses = get_habit_statuses_for_day([h for h in habits if not h.is_deleted], today)
+    return [habit_delta(habit, statuses.get(habit.id), today) for habit in habits]
+
+
+@bp.route('/api/habits/changes', methods=['GET'])
+def get_habit_changes():
+    """Habits changed since a data version: ?since=<version> from an earlier response.
+
+    Returns {"version": current, "changes": [habit_delta, ...]}, or "reset": true
+    when the client is too far behind and should reload GET /api/habits.
+    """
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({"error": "Missing or invalid since"}), 400
+
+    version = get_data_version(current_user_id())
+    habit_ids = get_changes_since(current_user_id(), since)
+    if habit_ids is None:
+        return jsonify({"version": version, "reset": True, "changes": []})
+
+    habits = user_habits(current_user_id()).filter(Habit.id.in_(habit_ids)).order_by(Habit.id).all() if habit_ids else []
+    return jsonify({"version": version, "changes": habit_deltas(habits, local_today())})
+
+
+@bp.route('/api/events', methods=['GET'])
+def habit_events():
+    """Server-Sent Events stream of habit changes ('habits' events carry habit deltas).
+
+    A reconnecting EventSource sends Last-Event-ID (a data version); whatever changed
+    since then is replayed first, or a 'reset' event tells the client to reload.
+    """
+    broadcaster = get_broadcaster()
+    subscriber = broadcaster.subscribe(current_user_id())
+    if subscriber is None:
+        return jsonify({"error": "Too many live connections"}), 503
+
+    initial = replay_events(request.headers.get('Last-Event-ID', type=int))
+    return Response(stream_with_context(stream(broadcaster, subscriber, initial)),
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no', # Don't let nginx buffer the stream
+}
+
+
+def replay_events(last_event_id):
+    """SSE messages catching a reconnecting client up from Last-Event-ID (a data version).
+
+    Closes the session afterwards: a stream shouldn't hold a connection for its lifetime.
+    """
+    initial = []
+    if last_event_id is not None:
+        version = get_data_version(current_user_id())
+        habit_ids = get_changes_since(current_user_id(), last_event_id)
+        if habit_ids is None:
+            initial.append(format_event("reset", version, {"version": version}))
+        elif habit_ids:
+            habits = user_habits(current_user_id()).filter(Habit.id.in_(habit_ids)).order_by(Habit.id).all()
+            initial.append(format_event("habits", version, {
+                "type": "replay", "version": version, "habits": habit_deltas(habits, local_today())}))
+    db.session.close()
+    return initial
+
+
+def publish_habits(event_type: str, version: int, deltas):
+    """Pushes habit deltas to every connected dashboard (after the write committed)."""
+    get_broadcaster().publish(current_user_id(), "habits", version, {"type": event_type, "version": version, "habits": deltas})
+
+
+@bp.route('/api/habits', methods=['POST'])
 def add_habit():
     """Add a new habit."""
     data = request.get_json()
@@ -74,125 +244,320 @@ def add_habit():
     name = data['name']
     frequency = data['frequency_type']
 
-    if frequency not in ['daily_all', 'daily_weekdays', 'weekly']:
+    if frequency not in FREQUENCY_RULES:
          return jsonify({"error": "Invalid frequency_type"}), 400
 
-    new_habit = Habit(name=name, frequency_type=frequency)
+    new_habit = Habit(user_id=current_user_id(), name=name, frequency_type=frequency)
+    new_habit.stats = HabitStats() # Start with an empty materialized summary
     db.session.add(new_habit)
+    db.session.flush() # Assigns the id
+    version = bump_data_version(current_user_id(), [new_habit.id])
     db.session.commit()
 
+    delta = habit_deltas([new_habit], local_today())[0]
+    publish_habits("added", version, [delta])
     return jsonify({
         "id": new_habit.id,
         "name": new_habit.name,
-        "frequency_type": new_habit.frequency_type
+        "frequency_type": new_habit.frequency_type,
+        "habit": delta,
+        "version": version
     }), 201
 
-@app.route('/api/habits/<int:habit_id>/complete', methods=['POST'])
+@bp.route('/api/habits/<int:habit_id>/complete', methods=['POST'])
 def complete_habit_today(habit_id):
     """Mark a habit as complete for today."""
-    habit = Habit.query.get(habit_id)
+    habit = get_user_habit(current_user_id(), habit_id)
     if not habit or habit.is_deleted:
         return jsonify({"error": "Habit not found"}), 404
 
-    today = date.today()
+    today = local_today()
 
-    # Check if already completed today
-    existing_entry = HabitEntry.query.filter_by(habit_id=habit_id, completion_date=today).first()
-    if existing_entry:
+    # Insert unless already completed today (ON CONFLICT DO NOTHING, no check-then-insert race)
+    if not insert_completions({(habit_id, today)}):
         return jsonify({"message": "Habit already completed today"}), 200 # Or 409 Conflict
 
-    # Add new entry
-    new_entry = HabitEntry(habit_id=habit_id, completion_date=today)
-    db.session.add(new_entry)
+    record_completion(habit, today) # Keep the stats row in step, same transaction
+    version = bump_data_version(current_user_id(), [habit.id])
     db.session.commit()
 
+    delta = habit_delta(habit, "done_today", today)
+    publish_habits("completed", version, [delta])
     return jsonify({
         "message": "Habit marked as complete for today",
         "habit_id": habit.id,
-        "date": today.isoformat()
+        "date": today.isoformat(),
+        "habit": delta,
+        "version": version
     }), 201
 
 # Optional: Add an endpoint to UNcomplete a task for today
-@app.route('/api/habits/<int:habit_id>/uncomplete', methods=['POST'])
+@bp.route('/api/habits/<int:habit_id>/uncomplete', methods=['POST'])
 def uncomplete_habit_today(habit_id):
     """Unmarks a habit completion for today."""
-    habit = Habit.query.get(habit_id)
+    habit = get_user_habit(current_user_id(), habit_id)
     if not habit or habit.is_deleted:
         return jsonify({"error": "Habit not found"}), 404
 
-    today = date.today()
-    entry = HabitEntry.query.filter_by(habit_id=habit_id, completion_date=today).first()
-
-    if not entry:
+    today = local_today()
+    # One DELETE, no check-then-delete race: of two concurrent uncompletes only one
+    # removes the row, the other one changes nothing (no stats, version or event)
+    entries = HabitEntry.__table__
+    deleted = db.session.execute(
+        entries.delete().where(entries.c.habit_id == habit_id, entries.c.completion_date == today)
+    ).rowcount
+    if not deleted:
+        db.session.rollback()
         return jsonify({"error": "Habit was not completed today"}), 404
 
-    db.session.delete(entry)
+    record_uncompletion(habit, today)
+    version = bump_data_version(current_user_id(), [habit.id])
     db.session.commit()
 
-    return jsonify({"message": "Habit completion for today removed"}), 200
+    delta = habit_deltas([habit], today)[0]
+    publish_habits("uncompleted", version, [delta])
+    return jsonify({
+        "message": "Habit completion for today removed",
+        "habit": delta,
+        "version": version
+    }), 200
+
+
+@bp.route('/api/completions', methods=['POST'])
+def bulk_complete_habits():
+    """Mark many habits complete on many days (backfill/import) in one transaction.
+
+    Body: {"completions": [{"habit_id": 1, "date": "YYYY-MM-DD"}, ...]}
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('completions'), list):
+        return jsonify({"error": "Missing completions list"}), 400
+
+    items = data['completions']
+    if len(items) > current_app.config['MAX_BULK_COMPLETIONS']:
+        return jsonify({"error": f"At most {current_app.config['MAX_BULK_COMPLETIONS']} completions per request"}), 400
+
+    results = bulk_complete(current_user_id(), items, local_today())
+    touched = sorted({r["habit_id"] for r in results if r["status"] == "created"})
+    version = bump_data_version(current_user_id(), touched) if touched else get_data_version(current_user_id())
+    db.session.commit()
+
+    habits = user_habits(current_user_id()).filter(Habit.id.in_(touched)).order_by(Habit.id).all() if touched else []
+    deltas = habit_deltas(habits, local_today())
+    if deltas:
+        publish_habits("completed", version, deltas)
+    return jsonify({
+        "created": sum(1 for r in results if r["status"] == "created"),
+        "results": results,
+        "habits": deltas,
+        "version": version
+    }), 200
 
 
-@app.route('/api/habits/<int:habit_id>', methods=['DELETE'])
+@bp.route('/api/habits/<int:habit_id>', methods=['DELETE'])
 def delete_habit(habit_id):
     """Delete a habit (soft delete)."""
-    habit = Habit.query.get(habit_id)
+    habit = get_user_habit(current_user_id(), habit_id)
     if not habit:
         return jsonify({"error": "Habit not found"}), 404
 
     # Soft delete: Mark as deleted instead of removing from DB
     habit.is_deleted = True
+    habit.deleted_at = datetime.utcnow() # manage.py archive moves it out after the grace period
     # Optionally delete future entries or keep history? Soft delete keeps history.
     # Hard delete: db.session.delete(habit)
+    version = bump_data_version(current_user_id(), [habit.id])
     db.session.commit()
 
-    return jsonify({"message": "Habit marked as deleted"}), 200
-
-
-@app.route('/api/habits/<int:habit_id>/stats', methods=['GET'])
+    delta = habit_delta(habit, None, local_today())
+    publish_habits("deleted", version, [delta])
+    return jsonify({
+        "message": "Habit marked as deleted",
+        "habit": delta,
+        "version": version
+    }), 200
+
+
+def parse_history_window(args, today: date):
+    """Reads ?month=YYYY-MM or ?from=YYYY-MM-DD&to=YYYY-MM-DD, defaulting to the current month.
+
+    Returns (start, end) or raises ValueError with a message for the client.
+    """
+    if 'month' in args:
+        try:
+            year, month = (int(part) for part in args['month'].split('-'))
+            return month_bounds(year, month)
+        except ValueError:
+            raise ValueError("month must be YYYY-MM")
+
+    if 'from' not in args and 'to' not in args:
+        return month_bounds(today.year, today.month)
+
+    try:
+        start = date.fromisoformat(args['from']) if 'from' in args else None
+        end = date.fromisoformat(args['to']) if 'to' in args else today
+    except ValueError:
+        raise ValueError("from/to must be YYYY-MM-DD")
+    if start is None:
+        start = month_bounds(end.year, end.month)[0]
+    if start > end:
+        raise ValueError("from must not be after to")
+    if (end - start).days >= current_app.config['MAX_HISTORY_WINDOW_DAYS']:
+        raise ValueError(f"window must be shorter than {current_app.config['MAX_HISTORY_WINDOW_DAYS']} days")
+    return start, end
+
+
+@bp.route('/api/habits/<int:habit_id>/stats', methods=['GET'])
+@conditional_json(get_data_version)
 def get_habit_stats(habit_id):
-    """Get statistics for a specific habit."""
-    habit = Habit.query.filter_by(id=habit_id, is_deleted=False).first()
+    """Get statistics for a specific habit, with completions for a window of dates."""
+    habit = user_habits(current_user_id()).filter_by(id=habit_id, is_deleted=False).first()
     if not habit:
         return jsonify({"error": "Habit not found"}), 404
 
-    streaks = calculate_streaks(habit_id)
-    entries = HabitEntry.query.filter_by(habit_id=habit_id).order_by(HabitEntry.completion_date).all()
+    today = local_today()
+    try:
+        start, end = parse_history_window(request.args, today)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Data for calendar view (list of completion dates)
-    completion_dates = [entry.completion_date.isoformat() for entry in entries]
+    # Streaks and totals come from the materialized stats row
+    summary = get_stats_summary(habit, today)
 
-    # Overall status (e.g., total completions)
-    total_completions = len(entries)
-    goals_met = total_completions # Simple example, could be more complex
+    goals_met = summary["total_completions"] # Simple example, could be more complex
 
     return jsonify({
         "id": habit.id,
         "name": habit.name,
         "frequency_type": habit.frequency_type,
         "created_at": habit.created_at.isoformat(),
-        "current_streak": streaks["current_streak"],
-        "best_streak": streaks["best_streak"],
+        "current_streak": summary["current_streak"],
+        "best_streak": summary["best_streak"],
         "goals_met": goals_met, # Total completions
-        "completion_dates": completion_dates # For calendar highlighting
+        # For calendar highlighting: {"YYYY-MM": bitmap}, bit (day - 1) set when completed
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "completion_months": get_completion_bitmaps(habit_id, start, end)
     })
 
 
+@bp.route('/api/analytics', methods=['GET'])
+@conditional_json(get_data_version)
+def get_analytics():
+    """Completion analytics across habits: contribution grid, weekday heatmap,
+    weekly/monthly totals and rolling completion rates.
+
+    ?from=&to= or ?month= (default: the last 365 days; never past today),
+    ?habit_ids=1,2 (default: all active),
+    ?window=<days> for the rolling rate (default 30), ?grids=1 for per-habit grids.
+    """
+    if analytics is None:
+        return jsonify({"error": "Analytics need NumPy installed"}), 501
+
+    today = local_today()
+    try:
+        if 'from' in request.args or 'to' in request.args or 'month' in request.args:
+            start, end = parse_history_window(request.args, today)
+        else:
+            start, end = today - timedelta(days=364), today
+        # Days after today aren't due yet: counting them would drag every rate down
+        end = min(end, today)
+        if start > end:
+            raise ValueError("the window starts after today")
+        window = request.args.get('window', '30')
+        if not window.isdigit() or int(window) < 1:
+            raise ValueError("window must be a positive number of days")
+        window = int(window)
+        habit_ids = None
+        if 'habit_ids' in request.args:
+            parts = request.args['habit_ids'].split(',')
+            if not all(part.isdigit() for part in parts):
+                raise ValueError("habit_ids must be a comma-separated list of ids")
+            habit_ids = [int(part) for part in parts]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = user_habits(current_user_id()).filter_by(is_deleted=False)
+    if habit_ids is not None:
+        query = query.filter(Habit.id.in_(habit_ids))
+    habits = query.order_by(Habit.id).all()
+
+    return jsonify(analytics.habit_analytics(habits, start, end, window,
+                                             per_habit_grids=request.args.get('grids') == '1',
+                                             created_on=[local_date(h.created_at) for h in habits]))
+
+
+# --- Export / Import ---
+
+EXPORT_MIMETYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+@bp.route('/api/export/<kind>.<fmt>', methods=['GET'])
+def export_data(kind, fmt):
+    """Streams all habits or all completions as CSV or JSON Lines (e.g. /api/export/completions.csv)."""
+    if kind not in transfer.FIELDS or fmt not in transfer.FORMATS:
+        return jsonify({"error": "Export habits or completions as .csv or .jsonl"}), 404
+
+    response = Response(stream_with_context(transfer.export_rows(current_user_id(), kind, fmt)), mimetype=EXPORT_MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
+@bp.route('/api/import/<kind>.<fmt>', methods=['POST'])
+def import_data(kind, fmt):
+    """Imports habits or completions from a CSV or JSON Lines request body, read as a stream.
+
+    Completions already recorded are skipped, so an import can be safely re-run.
+    Import habits first: they get new ids, and completions are matched to them
+    through the habit ids of the export; completions of other ids are not imported.
+    """
+    if kind not in transfer.FIELDS or fmt not in transfer.FORMATS:
+        return jsonify({"error": "Import habits or completions as .csv or .jsonl"}), 404
+
+    text = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    records = transfer.read_records(text, fmt)
+    version_before = get_data_version(current_user_id())
+    try:
+        if kind == "habits":
+            counts = transfer.import_habits(current_user_id(), records)
+        else:
+            counts = transfer.import_completions(current_user_id(), records)
+    except (csv.Error, UnicodeDecodeError) as e:
+        db.session.rollback()
+        # Batches before the bad input stay imported (their stats rebuilt, the version bumped)
+        version = get_data_version(current_user_id())
+        if version != version_before:
+            get_broadcaster().publish(current_user_id(), "reset", version, {"version": version})
+        return jsonify({"error": f"Could not parse the {fmt} body: {e}", "version": version}), 400
+
+    version = get_data_version(current_user_id())
+    if counts["inserted"]:
+        get_broadcaster().publish(current_user_id(), "reset", version, {"version": version}) # Too many changes for deltas
+    return jsonify({**counts, "version": version})
+
+
 # --- Optional Simple HTML Interface ---
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Render a basic HTML page to interact with the API."""
     # This route doesn't fetch data itself, it serves the HTML.
     # JavaScript in index.html will call the /api/habits endpoint.
     return render_template('index.html')
 
-@app.route('/habit/<int:habit_id>')
+@bp.route('/habit/<int:habit_id>')
 def habit_detail(habit_id):
      """Render a basic detail page for a habit."""
      # JavaScript on this page will call /api/habits/<id>/stats
-     habit = Habit.query.get_or_404(habit_id) # Ensure habit exists
+     habit = get_user_habit(current_user_id(), habit_id) # Ensure habit exists
+     if not habit:
+         abort(404)
      return render_template('habit_detail.html', habit_name=habit.name, habit_id=habit.id)
 
 
 if __name__ == '__main__':
+    # Development server only; see README for running with gunicorn or uvicorn
+    app = create_app()
+    with app.app_context():
+        db.create_all() # Convenience for a fresh checkout
     app.run(debug=True) # Enable debug mode for development
\ No newline at end of file
@@ -0,0 +1,118 @@
+# archive.py
+from datetime import datetime, timedelta
+from models import db, Habit, HabitEntry, HabitStats, ImportedHabit, ArchivedHabit, ArchivedHabitEntry
+from services import rebuild_habit_stats, bump_data_version
+
+# Soft-deleted habits stay in the live tables (so a delete can be undone) until
+# their grace period is over; archive_deleted_habits() then moves them and their
+# entries to the archived_* tables, and restore_habits() moves them back.
+
+ARCHIVE_BATCH_SIZE = 100 # Habits moved per transaction
+
+
+def archive_deleted_habits(grace_days: int, now: datetime = None):
+    """Moves habits soft deleted more than grace_days ago, with their entries, to the archive tables.
+
+    Habits deleted before deletion times were recorded (no deleted_at) get stamped
+    now, so their grace period starts instead of them being archived right away.
+    Returns {"habits": n, "entries": n} moved.
+    """
+    now = now or datetime.utcnow()
+    habit_table, entry_table = Habit.__table__, HabitEntry.__table__
+    db.session.execute(
+        habit_table.update()
+          .where(habit_table.c.is_deleted == True, habit_table.c.deleted_at.is_(None))
+          .values(deleted_at=now)
+    )
+    db.session.commit()
+
+    cutoff = now - timedelta(days=grace_days)
+    habit_ids = db.session.scalars(
+        db.select(habit_table.c.id)
+          .where(habit_table.c.is_deleted == True, habit_table.c.deleted_at <= cutoff)
+          .order_by(habit_table.c.id)
+    ).all()
+
+    counts = {"habits": 0, "entries": 0}
+    for start in range(0, len(habit_ids), ARCHIVE_BATCH_SIZE):
+        batch = habit_ids[start:start + ARCHIVE_BATCH_SIZE]
+        # Copy, then delete, in one transaction per batch
+        for habit in Habit.query.filter(Habit.id.in_(batch)).all():
+            archived = ArchivedHabit(habit_id=habit.id, user_id=habit.user_id, name=habit.name,
+                                     frequency_type=habit.frequency_type, created_at=habit.created_at,
+                                     deleted_at=habit.deleted_at, archived_at=now)
+            db.session.add(archived)
+            db.session.flush()
+            counts["entries"] += db.session.execute(ArchivedHabitEntry.__table__.insert().from_select(
+                ('archived_habit_id', 'completion_date', 'timestamp'),
+                db.select(db.literal(archived.id), entry_table.c.completion_date, entry_table.c.timestamp)
+                  .where(entry_table.c.habit_id == habit.id)
+            )).rowcount
+        # Entries, stats and import mappings before their habit (foreign keys)
+        db.session.execute(entry_table.delete().where(entry_table.c.habit_id.in_(batch)))
+        db.session.execute(HabitStats.__table__.delete().where(HabitStats.habit_id.in_(batch)))
+        db.session.execute(ImportedHabit.__table__.delete().where(ImportedHabit.habit_id.in_(batch)))
+        db.session.execute(habit_table.delete().where(habit_table.c.id.in_(batch)))
+        db.session.commit()
+        db.session.expunge_all() # The deleted habits are still in the identity map
+        counts["habits"] += len(batch)
+    return counts
+
+
+def list_archived_habits():
+    """Archived habits with their entry counts, oldest archive first."""
+    return db.session.execute(
+        db.select(ArchivedHabit, db.func.count(ArchivedHabitEntry.id))
+          .outerjoin(ArchivedHabitEntry, ArchivedHabitEntry.archived_habit_id == ArchivedHabit.id)
+          .group_by(ArchivedHabit.id)
+          .order_by(ArchivedHabit.id)
+    ).all()
+
+
+def restore_habits(archived_ids):
+    """Moves archived habits (by archive id) and their entries back to the live tables, undeleted.
+
+    A habit keeps its old id unless that has been reused since, then it gets a new
+    one. Returns a dict of archive id -> live habit id (unknown ids are left out).
+    """
+    archived = ArchivedHabit.query.filter(ArchivedHabit.id.in_(archived_ids)).order_by(ArchivedHabit.id).all()
+    if not archived:
+        return {}
+    taken = set(db.session.scalars(db.select(Habit.id).where(Habit.id.in_([a.habit_id for a in archived]))))
+
+    restored = {}
+    by_user = {} # user id -> restored habit ids
+    archive_entries = ArchivedHabitEntry.__table__
+    for a in archived:
+        habit = Habit(user_id=a.user_id, name=a.name, frequency_type=a.frequency_type, created_at=a.created_at,
+                      is_deleted=False)
+        if a.habit_id not in taken:
+            habit.id = a.habit_id
+            taken.add(a.habit_id) # Two archived copies of the same id: only the first keeps it
+        db.session.add(habit)
+        db.session.flush()
+        db.session.execute(HabitEntry.__table__.insert().from_select(
+            ('habit_id', 'completion_date', 'timestamp'),
+            db.select(db.literal(habit.id), archive_entries.c.completion_date, archive_entries.c.timestamp)
+              .where(archive_entries.c.archived_habit_id == a.id)
+        ))
+        rebuild_habit_stats(habit)
+        restored[a.id] = habit.id
+        by_user.setdefault(a.user_id, []).append(habit.id)
+
+    db.session.execute(archive_entries.delete().where(archive_entries.c.archived_habit_id.in_(list(restored))))
+    db.session.execute(ArchivedHabit.__table__.delete().where(ArchivedHabit.id.in_(list(restored))))
+    for user_id, habit_ids in by_user.items():
+        bump_data_version(user_id, habit_ids)
+    db.session.commit()
+    return restored
+
+
+def compact_database():
+    """Reclaims the space freed by archiving and refreshes planner statistics."""
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if db.engine.dialect.name == 'sqlite':
+            conn.exec_driver_sql("VACUUM")
+            conn.exec_driver_sql("ANALYZE")
+        elif db.engine.dialect.name == 'postgresql':
+            conn.exec_driver_sql("VACUUM ANALYZE")
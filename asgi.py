@@ -0,0 +1,143 @@
+# asgi.py
+"""Optional ASGI entry point (needs `pip install asgiref uvicorn`):
+
+    uvicorn asgi:app --workers 4
+
+Regular requests run in asgiref's thread pool through the Flask (WSGI) app.
+GET /api/events is served natively with asyncio instead, so an open live-update
+stream costs a coroutine rather than a worker thread.
+"""
+
+import asyncio
+import json
+import queue
+from asgiref.wsgi import WsgiToAsgi
+from flask import request
+from app import SSE_HEADERS, create_app, replay_events
+from auth import authenticate
+from events import KEEP_ALIVE, RETRY
+
+HEARTBEAT_SECONDS = 15.0
+
+
+class HabitsASGI:
+    """ASGI app: /api/events handled here, everything else by the wrapped Flask app."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == '/api/events':
+            await self.events(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def events(self, scope, receive, send):
+        """Same stream as the Flask /api/events view, without a thread per client."""
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def wakeup():
+            # Called from the threads that handle writes
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass # Loop already closed
+
+        # Authentication and replay read the database, so they run in a thread, with the client's headers
+        broadcaster = self.flask_app.extensions['broadcaster']
+        status, subscriber, initial = await loop.run_in_executor(None, self._open, scope, broadcaster, wakeup)
+        if status == 401:
+            await send_json(send, 401, {"error": "Authentication required"})
+            return
+        if status == 503:
+            await send_json(send, 503, {"error": "Too many live connections"})
+            return
+
+        try:
+
+            disconnected = asyncio.Event()
+
+            async def watch_disconnect():
+                while (await receive())['type'] != 'http.disconnect':
+                    pass
+                disconnected.set()
+                wake.set()
+
+            watcher = asyncio.ensure_future(watch_disconnect())
+            try:
+                headers = [(b'content-type', b'text/event-stream; charset=utf-8')]
+                headers += [(name.lower().encode(), value.encode()) for name, value in SSE_HEADERS.items()]
+                await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+                await send_text(send, RETRY + "".join(initial))
+
+                while not disconnected.is_set() and not subscriber.dropped:
+                    try:
+                        await asyncio.wait_for(wake.wait(), HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        await send_text(send, KEEP_ALIVE)
+                        continue
+                    wake.clear()
+                    messages = []
+                    while True:
+                        try:
+                            messages.append(subscriber.queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    if messages:
+                        await send_text(send, "".join(messages))
+
+                if not disconnected.is_set():
+                    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                watcher.cancel()
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    def _open(self, scope, broadcaster, wakeup):
+        """Authenticates, subscribes, then replays: (status, subscriber, initial messages).
+
+        Subscribing before the replay, like the Flask view, so nothing published in
+        between is lost (at worst an event arrives twice).
+        """
+        headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+        # A request context only, no dispatch: the user comes from the client's token,
+        # local_today() from its timezone
+        with self.flask_app.test_request_context(scope['path'], headers=headers,
+                                                 query_string=scope.get('query_string', b'')):
+            user_id = authenticate()
+            if user_id is None:
+                return 401, None, []
+            subscriber = broadcaster.subscribe(user_id, wakeup)
+            if subscriber is None:
+                return 503, None, []
+            try:
+                return 200, subscriber, replay_events(request.headers.get('Last-Event-ID', type=int))
+            except BaseException:
+                broadcaster.unsubscribe(subscriber)
+                raise
+
+
+async def send_text(send, text: str):
+    await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+
+
+async def send_json(send, status: int, payload: dict):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode()})
+
+
+app = HabitsASGI(create_app())
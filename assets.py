@@ -0,0 +1,138 @@
+# assets.py
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+try:
+    import brotli # Optional: without it only gzip variants are built
+except ImportError:
+    brotli = None
+
+# Fingerprinted front-end assets. `python manage.py build-assets` copies each
+# file in ASSET_FILES to static/dist/ under a content-hashed name, next to
+# precompressed .gz/.br variants, and writes manifest.json. Templates link
+# them with asset_url(); since a name changes whenever the content does, they
+# are served as immutable for a year. Without a manifest (or in debug mode)
+# asset_url() falls back to the plain /static/ files.
+
+ASSET_FILES = ('script.js', 'detail_script.js', 'style.css')
+BUILD_DIR = 'dist' # Under the static folder
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 3600
+ENCODINGS = (('br', '.br'), ('gzip', '.gz')) # Preferred first
+HASHED_NAME = re.compile(r'^[\w-]+\.[0-9a-f]{12}\.\w+$') # What hashed_name() produces
+
+bp = Blueprint('assets', __name__) # Public, unlike the habits blueprint
+
+
+def build_dir(static_folder: str) -> str:
+    return os.path.join(static_folder, BUILD_DIR)
+
+
+def hashed_name(filename: str, content: bytes) -> str:
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def _write(path: str, content: bytes):
+    # Through a temporary file, so a running server never reads a partial asset
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+
+def build_assets(static_folder: str, prune: bool = False):
+    """Writes the hashed copies, their compressed variants and the manifest.
+
+    Files of earlier builds are kept (pages rendered by workers that haven't
+    restarted yet still link them) unless prune is set. Returns
+    {filename: {"name", "size", "gzip", "br"}}, sizes in bytes (None when no
+    variant was written).
+    """
+    target = build_dir(static_folder)
+    os.makedirs(target, exist_ok=True)
+    manifest, report = {}, {}
+    for filename in ASSET_FILES:
+        with open(os.path.join(static_folder, filename), 'rb') as f:
+            content = f.read()
+        name = hashed_name(filename, content)
+        _write(os.path.join(target, name), content)
+        sizes = {"name": name, "size": len(content), "gzip": None, "br": None}
+        variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)} # mtime=0: same bytes every build
+        if brotli is not None:
+            variants["br"] = brotli.compress(content, quality=11)
+        for encoding, suffix in ENCODINGS:
+            compressed = variants.get(encoding)
+            if compressed is not None and len(compressed) < len(content):
+                _write(os.path.join(target, name + suffix), compressed)
+                sizes[encoding] = len(compressed)
+        manifest[filename] = name
+        report[filename] = sizes
+    _write(os.path.join(target, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+    if prune:
+        keep = set(manifest.values())
+        for entry in os.listdir(target):
+            base = entry
+            for _, suffix in ENCODINGS:
+                base = base.removesuffix(suffix)
+            if entry != MANIFEST and base not in keep:
+                os.remove(os.path.join(target, entry))
+    return report
+
+
+def load_manifest(static_folder: str) -> dict:
+    """Source filename -> hashed filename, empty when assets haven't been built."""
+    try:
+        with open(os.path.join(build_dir(static_folder), MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(filename: str) -> str:
+    """URL of a front-end asset: the fingerprinted copy when built, else the plain static file."""
+    name = current_app.extensions['asset_manifest'].get(filename)
+    if name is None or current_app.debug: # Debug: edits show up without a rebuild
+        return url_for('static', filename=filename)
+    return url_for('assets.hashed_asset', filename=name)
+
+
+@bp.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    """Serves a fingerprinted asset, precompressed when the client accepts it.
+
+    Any content-hashed name in the build directory, not just this worker's
+    manifest: during a rolling restart, pages rendered by new workers ask old
+    ones for the new names (and the other way round). Unhashed files such as
+    the manifest change from build to build, so they mustn't be cached as
+    immutable and are a 404.
+    """
+    if not HASHED_NAME.match(filename):
+        abort(404)
+    directory = build_dir(current_app.static_folder)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding, suffix = None, ''
+    for candidate, candidate_suffix in ENCODINGS:
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(directory, filename + candidate_suffix)):
+            encoding, suffix = candidate, candidate_suffix
+            break
+
+    response = send_from_directory(directory, filename + suffix, mimetype=mimetype, max_age=MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """Loads the manifest (once per worker) and exposes asset_url() to templates."""
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.register_blueprint(bp)
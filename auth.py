@@ -0,0 +1,61 @@
+# auth.py
+import hashlib
+import secrets
+from flask import current_app, g, request
+from models import db, User, ApiToken
+
+# Token authentication. API clients send "Authorization: Bearer <token>"; the
+# HTML pages (and their EventSource) use the token cookie set by /login.
+
+TOKEN_COOKIE = 'token'
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_user(name: str):
+    """Adds a user (flushed, not committed)."""
+    user = User(name=name)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def create_token(user_id: int, name: str = None) -> str:
+    """Adds a new API token for the user and returns it. Only its hash is stored, so it can't be shown again."""
+    token = secrets.token_urlsafe(32)
+    db.session.add(ApiToken(user_id=user_id, token_hash=hash_token(token), name=name))
+    return token
+
+
+def user_id_for_token(token):
+    """Owner of the token, or None when it is missing or unknown."""
+    if not token:
+        return None
+    return db.session.scalar(db.select(ApiToken.user_id).filter(ApiToken.token_hash == hash_token(token)))
+
+
+def request_token():
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return request.cookies.get(TOKEN_COOKIE)
+
+
+def authenticate():
+    """Resolves and remembers the request's user id; None when the request isn't authenticated.
+
+    With SINGLE_USER configured (a user name), requests without a token act as that
+    user, for a personal install without logins.
+    """
+    user_id = user_id_for_token(request_token())
+    if user_id is None and current_app.config.get('SINGLE_USER'):
+        user_id = db.session.scalar(db.select(User.id).filter(User.name == current_app.config['SINGLE_USER']))
+    g.user_id = user_id
+    return user_id
+
+
+def current_user_id():
+    """The authenticated user of the current request."""
+    return g.user_id
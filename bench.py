@@ -0,0 +1,241 @@
+# bench.py
+"""Benchmarks for the API endpoints and the services layer.
+
+    python bench.py run --out bench/before.json [--scenarios many_habits,long_history] [--iterations 50]
+    python bench.py compare bench/before.json bench/after.json [--threshold 0.25]
+
+Every scenario runs in its own process against its own generated SQLite database
+(cached in --data-dir), since the app binds its database at import time.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# name -> (habits, days of history)
+SCENARIOS = {
+    "small": (5, 90),
+    "many_habits": (500, 90),
+    "long_history": (10, 3650),
+    "many_habits_long_history": (500, 3650),
+}
+
+
+def percentile(sorted_values, p: float):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = math.ceil(p / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, k))]
+
+
+def measure(fn, iterations: int, warmup: int = 3):
+    """Latency percentiles (ms), queries per call and peak traced memory (KiB) for fn()."""
+    from sqlalchemy import event
+    from models import db
+
+    for _ in range(warmup):
+        fn()
+
+    queries = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        queries[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries_per_call = queries[0] / iterations
+
+        # Memory in a separate pass, tracemalloc slows everything down
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(timings[-1], 3),
+        "queries": round(queries_per_call, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_scenario(name: str, iterations: int, seed: int):
+    """Generates (if needed) and benchmarks one scenario. Runs inside the scenario's process."""
+    from models import db, Habit, User
+    from clock import local_today
+    import auth
+    import seed as seeding
+    import services
+
+    app = seeding.app
+    habits, days = SCENARIOS[name]
+    with app.app_context():
+        db.create_all()
+        user_id = db.session.scalar(db.select(User.id).filter(User.name == "bench"))
+        if user_id is None or services.user_habits(user_id).count() != habits:
+            seeding.generate_dataset(habits, days, distribution="beta", seed=seed, clear=True, user_name="bench")
+            user_id = db.session.scalar(db.select(User.id).filter(User.name == "bench"))
+        token = auth.create_token(user_id, name="bench")
+        db.session.commit()
+
+    rng = random.Random(seed)
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    results = {}
+
+    with app.app_context():
+        today = local_today()
+        active = services.user_habits(user_id).filter_by(is_deleted=False).all()
+        habit_ids = [h.id for h in active]
+
+        def pick():
+            return rng.choice(habit_ids)
+
+        response_cache = app.extensions["response_cache"]
+
+        def get(url, cached=False):
+            if not cached:
+                response_cache.clear() # Measure the view, not the LRU hit
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+
+        benchmarks = {
+            "GET /api/habits": lambda: get("/api/habits"),
+            "GET /api/habits (cached)": lambda: get("/api/habits", cached=True),
+            "GET /api/habits/<id>/stats": lambda: get(f"/api/habits/{pick()}/stats"),
+            "services.calculate_streaks": lambda: services.calculate_streaks(user_id, pick(), today),
+            "services.get_habit_status_for_day": lambda: services.get_habit_status_for_day(
+                db.session.get(Habit, pick()), today),
+            "services.get_habit_statuses_for_day": lambda: services.get_habit_statuses_for_day(active, today),
+        }
+        for label, fn in benchmarks.items():
+            results[label] = measure(fn, iterations)
+
+    return {"habits": habits, "days": days, "benchmarks": results}
+
+
+def run(args):
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}")
+        return 2
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "scenarios": {},
+    }
+    for name in scenarios:
+        db_path = os.path.abspath(os.path.join(args.data_dir, f"{name}-{args.seed}.db"))
+        env = dict(os.environ, DATABASE_URL="sqlite:///" + db_path)
+        print(f"Running {name}...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "_scenario", name,
+             "--iterations", str(args.iterations), "--seed", str(args.seed)],
+            env=env, stdout=subprocess.PIPE, check=True, text=True,
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        report["scenarios"][name] = result
+        for label, stats in result["benchmarks"].items():
+            print(f"  {label:40} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  "
+                  f"{stats['queries']:6.1f} queries  {stats['peak_kib']:9.1f} KiB", file=sys.stderr)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+def compare(args):
+    """Exits non-zero when any benchmark got slower than the threshold or issues more queries."""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = 0
+    for scenario, base_result in baseline["scenarios"].items():
+        new_result = candidate["scenarios"].get(scenario)
+        if not new_result:
+            continue
+        for label, base in base_result["benchmarks"].items():
+            new = new_result["benchmarks"].get(label)
+            if not new:
+                continue
+            problems = []
+            for metric in ("p50_ms", "p95_ms"):
+                # Ignore noise on sub-millisecond timings
+                if new[metric] > base[metric] * (1 + args.threshold) and new[metric] - base[metric] > args.min_delta_ms:
+                    problems.append(f"{metric} {base[metric]:.2f} -> {new[metric]:.2f}")
+            if new["queries"] > base["queries"]:
+                problems.append(f"queries {base['queries']} -> {new['queries']}")
+            status = "REGRESSION" if problems else "ok"
+            regressions += bool(problems)
+            ratio = new["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+            print(f"{status:10} {scenario:26} {label:40} p50 x{ratio:5.2f}  {'; '.join(problems)}")
+
+    print(f"{regressions} regressions.")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the habit tracker.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark scenarios")
+    run_parser.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    run_parser.add_argument("--iterations", type=int, default=50)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--data-dir", default=os.path.join("instance", "bench"),
+                            help="Where the generated databases are kept between runs")
+    run_parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    compare_parser.set_defaults(func=compare)
+
+    # Internal: one scenario, JSON result on the last line of stdout
+    scenario_parser = subparsers.add_parser("_scenario")
+    scenario_parser.add_argument("name", choices=list(SCENARIOS))
+    scenario_parser.add_argument("--iterations", type=int, default=50)
+    scenario_parser.add_argument("--seed", type=int, default=42)
+    scenario_parser.set_defaults(func=lambda args: print(json.dumps(
+        run_scenario(args.name, args.iterations, args.seed))) or 0)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
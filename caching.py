@@ -0,0 +1,112 @@
+# caching.py
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import wraps
+from flask import current_app, request
+from clock import TIMEZONE_HEADER, local_today
+from auth import current_user_id
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialized JSON responses.
+
+    Entries are stored per (key, user's local day), so a write or the user's midnight
+    makes old entries unreachable; they are then evicted by LRU or dropped once
+    their day is over everywhere.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._newest_day = None
+        self.hits = 0
+        self.misses = 0
+
+    def _roll_day(self, today: date):
+        if self._newest_day is None or today > self._newest_day:
+            self._newest_day = today
+            # Local dates around the world span at most three days at once
+            oldest = today - timedelta(days=2)
+            for key in [key for key in self._entries if key[-1] < oldest]:
+                del self._entries[key]
+
+    def get(self, key, today: date):
+        key = (*key, today)
+        with self._lock:
+            self._roll_day(today)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, today: date, entry):
+        key = (*key, today)
+        with self._lock:
+            self._roll_day(today)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def make_etag(user_id: int, version: int, today: date, path: str) -> str:
+    """Strong ETag: same user, data version, (user-local) day and URL give the same bytes."""
+    digest = hashlib.sha1(f"{user_id}|{version}|{today.isoformat()}|{path}".encode()).hexdigest()[:16]
+    return f"v{version}-{digest}"
+
+
+def conditional_json(get_version, get_today=local_today, get_user=current_user_id):
+    """Decorator for read-only JSON views: ETag/304 handling plus the in-process response cache.
+
+    get_version(user_id) returns the user's data version and get_today() their
+    date; the view only runs on a cache miss.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = get_user()
+            version = get_version(user_id)
+            today = get_today()
+            path = request.full_path
+            etag = make_etag(user_id, version, today, path)
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                cache = current_app.extensions['response_cache']
+                key = (user_id, path, version)
+                cached = cache.get(key, today)
+                if cached is not None:
+                    body, mimetype = cached
+                    response = current_app.response_class(body, status=200, mimetype=mimetype)
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code == 200:
+                        cache.put(key, today, (response.get_data(), response.mimetype))
+
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                # Browsers keep the body but revalidate every time, which is a cheap 304
+                response.headers['Cache-Control'] = 'private, no-cache'
+                # The user and "today" come from these (the token cookie and the tz cookie)
+                response.vary.update(('Authorization', TIMEZONE_HEADER, 'Cookie'))
+            return response
+        return wrapper
+    return decorator
+
+
+def init_response_cache(app):
+    """Creates the app's response cache (RESPONSE_CACHE_SIZE entries)."""
+    cache = ResponseCache(app.config.get('RESPONSE_CACHE_SIZE', 256))
+    app.extensions['response_cache'] = cache
+    return cache
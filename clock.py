@@ -0,0 +1,55 @@
+# clock.py
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app, g, has_app_context, has_request_context, request
+
+# "Today" is the user's local date, not the server's. It is resolved once per
+# request so every status, streak and cache key in that request agrees on it.
+
+TIMEZONE_HEADER = 'X-Timezone' # IANA name sent by API clients, e.g. "Europe/Berlin"
+TIMEZONE_COOKIE = 'tz' # Set by the dashboard scripts (EventSource can't send headers)
+
+
+def get_timezone(name):
+    """ZoneInfo for an IANA timezone name, or None when it is empty or unknown."""
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def default_timezone():
+    """The configured TIMEZONE, or None for the server's local timezone."""
+    return get_timezone(current_app.config.get('TIMEZONE')) if has_app_context() else None
+
+
+def request_timezone():
+    """The timezone the client sent (header, then cookie), else the configured one."""
+    return (get_timezone(request.headers.get(TIMEZONE_HEADER))
+            or get_timezone(request.cookies.get(TIMEZONE_COOKIE))
+            or default_timezone())
+
+
+def today_in(tz) -> date:
+    """Current date in tz (None: server local time)."""
+    return datetime.now(tz).date() if tz is not None else date.today()
+
+
+def local_date(utc_moment: datetime) -> date:
+    """The user's date at a naive UTC timestamp (e.g. a created_at column)."""
+    tz = request_timezone() if has_request_context() else default_timezone()
+    return utc_moment.replace(tzinfo=timezone.utc).astimezone(tz).date() # None: server local time
+
+
+def local_today() -> date:
+    """The user's current date, fixed for the rest of the request.
+
+    Outside a request (CLI, seeding, benchmarks) it is the date in the configured TIMEZONE.
+    """
+    if not has_request_context():
+        return today_in(default_timezone())
+    if 'today' not in g:
+        g.today = today_in(request_timezone())
+    return g.today
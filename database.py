@@ -0,0 +1,76 @@
+# database.py
+import os
+from sqlalchemy import event
+
+# --- Database Profile ---
+# Everything can be overridden from the environment:
+#   DATABASE_URL          any SQLAlchemy URI (e.g. postgresql://...), defaults to instance/habits.db
+#   DB_PROFILE            'production' (WAL + tuned pragmas, default) or 'plain' (SQLite defaults)
+#   DB_BUSY_TIMEOUT_MS    how long a writer waits for a lock before "database is locked"
+#   SQLITE_CACHE_SIZE_KB  page cache per connection
+#   SQLITE_MMAP_SIZE_MB   memory-mapped I/O window
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE_S, DB_POOL_TIMEOUT_S  connection pool sizing
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def database_uri(instance_path: str) -> str:
+    """Database URI from DATABASE_URL, or the SQLite file in the instance folder."""
+    uri = os.environ.get('DATABASE_URL')
+    if not uri:
+        return 'sqlite:///' + os.path.join(instance_path, 'habits.db')
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):] # Old-style scheme SQLAlchemy no longer accepts
+    return uri
+
+
+def configure_database(app, instance_path: str):
+    """Fills in SQLALCHEMY_* settings for the selected profile. Call before db.init_app()."""
+    uri = database_uri(instance_path)
+    busy_timeout_ms = _env_int('DB_BUSY_TIMEOUT_MS', 5000)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE', 'production')
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': 'WAL', # Readers don't block the writer and vice versa
+        'synchronous': 'NORMAL', # Safe with WAL; no fsync on every commit
+        'cache_size': -_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024), # Negative = KiB
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE_MB', 256) * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': busy_timeout_ms,
+    }
+
+    if uri.startswith('sqlite'):
+        # The driver-level timeout is the busy handler for the very first statements too
+        engine_options = {'connect_args': {'timeout': busy_timeout_ms / 1000}}
+        if ':memory:' not in uri and uri != 'sqlite://':
+            engine_options.update(
+                pool_size=_env_int('DB_POOL_SIZE', 5),
+                max_overflow=_env_int('DB_MAX_OVERFLOW', 10),
+                pool_timeout=_env_int('DB_POOL_TIMEOUT_S', 30),
+            )
+    else:
+        engine_options = {
+            'pool_size': _env_int('DB_POOL_SIZE', 10),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT_S', 30),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE_S', 1800), # Drop connections the server may have closed
+            'pool_pre_ping': True,
+        }
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).update(engine_options)
+
+
+def install_sqlite_pragmas(app, engine):
+    """Applies the profile's PRAGMAs to every new SQLite connection. Call inside an app context."""
+    if engine.dialect.name != 'sqlite' or app.config.get('DB_PROFILE') != 'production':
+        return
+    pragmas = dict(app.config['SQLITE_PRAGMAS'])
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
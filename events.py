@@ -0,0 +1,99 @@
+# events.py
+import json
+import queue
+import threading
+
+RETRY = "retry: 3000\n\n" # Reconnect delay for EventSource
+KEEP_ALIVE = ": keep-alive\n\n" # Comment line, keeps proxies from closing the connection
+
+
+class Subscriber:
+    """One connected SSE client of a user: a bounded queue of pending events.
+
+    wakeup, if given, is called after every queued event (or drop); async streams
+    use it to get woken up without a thread blocking on the queue.
+    """
+
+    def __init__(self, user_id: int, max_queue: int, wakeup=None):
+        self.user_id = user_id # Whose events it receives
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = False # Set when the client fell too far behind
+        self.wakeup = wakeup
+
+
+class Broadcaster:
+    """In-process fan-out of habit-change events to each user's SSE clients.
+
+    Publishing never blocks: a client whose queue is full is dropped, and its
+    EventSource reconnects with Last-Event-ID to catch up from the changes log.
+    """
+
+    def __init__(self, max_clients: int = 100, max_queue: int = 100):
+        self.max_clients = max_clients
+        self.max_queue = max_queue
+        self._subscribers = {} # user id -> set of Subscribers
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int, wakeup=None):
+        """Returns a new Subscriber to the user's events, or None when at capacity."""
+        with self._lock:
+            if self._count >= self.max_clients:
+                return None
+            subscriber = Subscriber(user_id, self.max_queue, wakeup)
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+            self._count += 1
+            return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers and subscriber in subscribers:
+                subscribers.remove(subscriber)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+
+    def publish(self, user_id: int, event_type: str, version: int, payload: dict):
+        """Queues an event for every client of the user. Slow clients are dropped, not waited for."""
+        message = format_event(event_type, version, payload)
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+            if subscriber.wakeup:
+                subscriber.wakeup()
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return self._count
+
+
+def format_event(event_type: str, version, payload: dict) -> str:
+    """One text/event-stream message; the id is the data version it brings the client to."""
+    lines = []
+    if version is not None:
+        lines.append(f"id: {version}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(payload, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream(broadcaster: Broadcaster, subscriber: Subscriber, initial=(), heartbeat: float = 15.0):
+    """Generator of SSE text for one client: initial messages, then published events."""
+    try:
+        yield RETRY
+        for message in initial:
+            yield message
+        while not subscriber.dropped:
+            try:
+                yield subscriber.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield KEEP_ALIVE
+    finally:
+        broadcaster.unsubscribe(subscriber)
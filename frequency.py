@@ -0,0 +1,104 @@
+# frequency.py
+from datetime import date
+
+
+class FrequencyRule:
+    """Maps dates onto consecutive period ordinals for a habit frequency.
+
+    Two completions belong to the same streak when their periods are adjacent
+    integers, so every rule only has to say which dates count and which period
+    they fall into.
+    """
+    name = None
+
+    def applies_to(self, day: date) -> bool:
+        """Whether a completion on this day counts towards the streak."""
+        return True
+
+    def period_of(self, day: date) -> int:
+        """Ordinal of the period containing this day."""
+        raise NotImplementedError
+
+
+class DailyRule(FrequencyRule):
+    """Every calendar day is its own period."""
+    name = 'daily_all'
+
+    def period_of(self, day: date) -> int:
+        return day.toordinal()
+
+
+class WeekdaysRule(FrequencyRule):
+    """Every weekday is a period; weekends are skipped (Friday -> Monday is consecutive)."""
+    name = 'daily_weekdays'
+
+    def applies_to(self, day: date) -> bool:
+        return day.weekday() < 5 # Monday=0, Friday=4
+
+    def period_of(self, day: date) -> int:
+        # date.toordinal() == 1 is a Monday, so whole weeks contribute 5 weekdays each
+        return (day.toordinal() - 1) // 7 * 5 + min(day.weekday(), 4)
+
+
+class WeeklyRule(FrequencyRule):
+    """Every ISO week (Monday to Sunday) is a period."""
+    name = 'weekly'
+
+    def period_of(self, day: date) -> int:
+        return (day.toordinal() - 1) // 7
+
+
+FREQUENCY_RULES = {rule.name: rule for rule in (DailyRule(), WeekdaysRule(), WeeklyRule())}
+
+
+def get_frequency_rule(frequency_type: str) -> FrequencyRule:
+    """Returns the rule for a frequency type, falling back to daily."""
+    return FREQUENCY_RULES.get(frequency_type, FREQUENCY_RULES['daily_all'])
+
+
+def scan_runs(completion_dates, rule: FrequencyRule):
+    """Walks dates sorted ascending once.
+
+    Returns (best_run, latest_run, latest_period), where latest_run is the length
+    of the run ending at latest_period (None when nothing counts).
+    """
+    best_run = 0
+    run = 0
+    last_period = None
+
+    for day in completion_dates:
+        if not rule.applies_to(day):
+            continue
+        period = rule.period_of(day)
+        if period == last_period:
+            continue # Several completions in the same period
+        if last_period is not None and period == last_period + 1:
+            run += 1
+        else:
+            run = 1 # Streak broken, start new run
+        best_run = max(best_run, run)
+        last_period = period
+
+    return best_run, run, last_period
+
+
+def current_streak_for(rule: FrequencyRule, run: int, last_period, today: date) -> int:
+    """The latest run is still current if it reaches this period or the one before."""
+    if last_period is None:
+        return 0
+    if rule.applies_to(today):
+        if last_period >= rule.period_of(today) - 1:
+            return run
+    elif last_period >= rule.period_of(today):
+        # e.g., a weekend for weekday habits: Friday's period is the latest one due
+        return run
+    return 0
+
+
+def compute_streaks(completion_dates, rule: FrequencyRule, today: date):
+    """Current and best streak from completion dates sorted ascending, in one pass."""
+    best_run, run, last_period = scan_runs(completion_dates, rule)
+    return {
+        "current_streak": current_streak_for(rule, run, last_period, today),
+        "best_streak": best_run,
+    }
@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+# Production settings for `gunicorn -c gunicorn.conf.py wsgi:app`; each value can be overridden from the environment.
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+# Threads, so an open /api/events stream doesn't block a whole worker (asgi.py avoids even that)
+worker_class = "gthread"
+threads = int(os.environ.get("THREADS", 8))
+# Each open stream holds one of those threads for its lifetime: cap streams at half
+# of them so API requests are never starved (read by create_app() in every worker)
+os.environ.setdefault("SSE_MAX_CLIENTS", str(max(threads // 2, 1)))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
@@ -0,0 +1,184 @@
+# instrumentation.py
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from flask import abort, g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+# Opt-in (SQL_INSTRUMENTATION=1): nothing below is registered otherwise, so when
+# disabled there are no event listeners and no request hooks at all.
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is everything slower
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value_ms: float):
+        index = len(BUCKETS_MS)
+        for i, bound in enumerate(BUCKETS_MS):
+            if value_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += value_ms
+        self.count += 1
+
+    def to_dict(self):
+        # [[upper bound ms, count], ...] as a list so JSON keeps the bucket order
+        bounds = list(BUCKETS_MS) + ["inf"]
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "buckets": [[bound, n] for bound, n in zip(bounds, self.counts)],
+        }
+
+
+class RouteMetrics:
+    """Aggregates per route: request time, DB time and queries per request."""
+
+    def __init__(self):
+        self.request_ms = Histogram()
+        self.db_ms = Histogram()
+        self.queries = 0
+        self.max_queries = 0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+
+    def observe(self, request_ms: float, stats):
+        self.request_ms.observe(request_ms)
+        self.db_ms.observe(stats.db_ms)
+        self.queries += stats.queries
+        self.max_queries = max(self.max_queries, stats.queries)
+        if stats.slowest_ms > self.slowest_ms:
+            self.slowest_ms = stats.slowest_ms
+            self.slowest_statement = stats.slowest_statement
+
+    def to_dict(self):
+        requests = self.request_ms.count
+        return {
+            "requests": requests,
+            "request_ms": self.request_ms.to_dict(),
+            "db_ms": self.db_ms.to_dict(),
+            "queries_per_request": round(self.queries / requests, 2) if requests else 0,
+            "max_queries": self.max_queries,
+            "slowest_query_ms": round(self.slowest_ms, 3),
+            "slowest_statement": self.slowest_statement,
+        }
+
+
+class RequestStats:
+    """SQL activity of the current request (stored on flask.g)."""
+    __slots__ = ('started', 'queries', 'db_ms', 'slowest_ms', 'slowest_statement')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+
+    def add(self, statement: str, elapsed_ms: float):
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = " ".join(statement.split())[:500]
+
+
+class Metrics:
+    """Thread-safe registry of RouteMetrics keyed by 'METHOD /rule'."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route: str, request_ms: float, stats: RequestStats):
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = RouteMetrics()
+            metrics.observe(request_ms, stats)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: metrics.to_dict() for route, metrics in sorted(self._routes.items())}
+
+
+def _route_key():
+    rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+    return f"{request.method} {rule}"
+
+
+def init_instrumentation(app, engine):
+    """Hooks SQLAlchemy and Flask when app.config['SQL_INSTRUMENTATION'] is set. Call inside an app context."""
+    app.config.setdefault('SQL_INSTRUMENTATION', os.environ.get('SQL_INSTRUMENTATION', '') in ('1', 'true', 'yes'))
+    # Ops token for /api/_metrics: the histograms and statements cover every user
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    if not app.config['SQL_INSTRUMENTATION']:
+        return None
+
+    logger = app.logger.getChild('sql') # One JSON line per request
+    logger.setLevel(logging.INFO)
+    metrics = Metrics()
+    app.extensions['sql_metrics'] = metrics
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info['query_start'].pop()) * 1000
+        if has_request_context():
+            stats = g.get('sql_stats')
+            if stats is not None:
+                stats.add(statement, elapsed_ms)
+
+    @app.before_request
+    def start_request_stats():
+        g.sql_stats = RequestStats()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        request_ms = (time.perf_counter() - stats.started) * 1000
+        route = _route_key()
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.db_ms:.2f};desc="{stats.queries} queries", app;dur={request_ms:.2f}'
+        )
+        logger.info(json.dumps({
+            "route": route,
+            "status": response.status_code,
+            "duration_ms": round(request_ms, 3),
+            "queries": stats.queries,
+            "db_ms": round(stats.db_ms, 3),
+            "slowest_query_ms": round(stats.slowest_ms, 3),
+            "slowest_statement": stats.slowest_statement,
+        }))
+        metrics.observe(route, request_ms, stats)
+        return response
+
+    if app.config['METRICS_TOKEN']:
+        @app.route('/api/_metrics', methods=['GET'])
+        def sql_metrics():
+            """Aggregated per-route request/DB histograms (Authorization: Bearer <METRICS_TOKEN>)."""
+            expected = f"Bearer {app.config['METRICS_TOKEN']}"
+            if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+                abort(404) # Don't reveal the endpoint
+            return jsonify(metrics.snapshot())
+
+    return metrics
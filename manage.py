@@ -0,0 +1,321 @@
+# manage.py
+
+import argparse
+import os
+import re
+import sys
+from sqlalchemy import event, inspect
+from app import create_app
+from models import db, Habit, User, ApiToken
+from services import rebuild_habit_stats, rebuild_all_stats, bump_data_version
+import transfer
+import archive
+import assets
+import auth
+
+app = create_app()
+
+
+def rebuild_stats(args):
+    """Backfills or repairs the materialized HabitStats rows."""
+    with app.app_context(): # IMPORTANT: Operations must be within the app context
+        if args.habit_id is not None:
+            habit = db.session.get(Habit, args.habit_id)
+            if not habit:
+                print(f"Habit {args.habit_id} not found.")
+                return 1
+            rebuild_habit_stats(habit)
+            if habit.user_id is not None:
+                bump_data_version(habit.user_id, [habit.id]) # Invalidate cached responses of running workers
+            db.session.commit()
+            print(f"Rebuilt stats for {habit.name}.")
+        else:
+            count = rebuild_all_stats()
+            print(f"Rebuilt stats for {count} habits.")
+    return 0
+
+
+# Indexes replaced by ones leading with user_id
+OBSOLETE_INDEXES = {
+    "habit": ("ix_habit_active_created",),
+    "habit_change": ("ix_habit_change_version",),
+}
+
+
+def upgrade_db(args):
+    """Creates the schema, or brings an existing database up to it: new tables and indexes.
+
+    The app no longer creates tables on startup, so run this once per deploy.
+    """
+    with app.app_context():
+        db.create_all() # Missing tables (with their indexes)
+        inspector = inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    # Only nullable columns are ever added to existing tables
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    with db.engine.begin() as conn:
+                        conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                    print(f"Added column {column.name} to {table.name}.")
+            existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(db.engine)
+                    print(f"Created index {index.name} on {table.name}.")
+            for name in OBSOLETE_INDEXES.get(table.name, ()):
+                if name in existing:
+                    with db.engine.begin() as conn:
+                        conn.exec_driver_sql(f"DROP INDEX {name}")
+                    print(f"Dropped index {name} from {table.name}.")
+        if db.engine.dialect.name == "sqlite":
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE") # Refresh planner statistics
+        print("Database is up to date.")
+    return 0
+
+
+FULL_SCAN = re.compile(r"^SCAN (habit|habit_entry|habit_stats)$")
+
+
+def check_plans(args):
+    """Runs the hot read endpoints and fails if any of their queries does a full table scan."""
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            print("Plan check is only implemented for SQLite.")
+            return 1
+
+        habit = Habit.query.filter_by(is_deleted=False).first()
+        captured = []
+        headers = {}
+        if habit:
+            # Throwaway token, so the requests run as the habit's owner
+            token = auth.create_token(habit.user_id, name="check-plans")
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {token}"}
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            client = app.test_client()
+            if habit:
+                client.get("/api/habits", headers=headers)
+                client.get(f"/api/habits/{habit.id}/stats", headers=headers)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+            if habit:
+                db.session.execute(ApiToken.__table__.delete().where(ApiToken.name == "check-plans"))
+                db.session.commit()
+
+        if not captured:
+            # An empty database proves nothing; tests/test_query_plans.py uses fixture data
+            print("No queries checked: the database has no active habits.")
+            return 1
+
+        failures = 0
+        with db.engine.connect() as conn:
+            for statement, parameters in captured:
+                plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+                details = [row[-1] for row in plan]
+                if any(FULL_SCAN.match(detail) for detail in details):
+                    failures += 1
+                    print("FULL SCAN:", " ".join(statement.split()))
+                    for detail in details:
+                        print("    ", detail)
+        print(f"Checked {len(captured)} queries, {failures} full table scans.")
+    return 1 if failures else 0
+
+
+def _user_id(name):
+    user_id = db.session.scalar(db.select(User.id).filter(User.name == name))
+    if user_id is None:
+        raise SystemExit(f"No user named {name}.")
+    return user_id
+
+
+def create_user(args):
+    """Adds a user and prints their first API token."""
+    with app.app_context():
+        if db.session.scalar(db.select(User.id).filter(User.name == args.name)) is not None:
+            print(f"User {args.name} already exists.")
+            return 1
+        user = auth.create_user(args.name)
+        token = auth.create_token(user.id, name=args.token_name)
+        if args.claim_unowned:
+            # Habits from before there were users
+            claimed = db.session.execute(
+                Habit.__table__.update().where(Habit.user_id.is_(None)).values(user_id=user.id)
+            ).rowcount
+            print(f"Assigned {claimed} habits without an owner to {args.name}.")
+        db.session.commit()
+        print(f"Created user {args.name}. API token (shown only once):")
+        print(token)
+    return 0
+
+
+def create_token(args):
+    """Prints a new API token for an existing user."""
+    with app.app_context():
+        token = auth.create_token(_user_id(args.name), name=args.token_name)
+        db.session.commit()
+        print(token)
+    return 0
+
+
+def _format_of(path, fmt):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path or "")[1].lstrip(".").lower()
+    return extension if extension in transfer.FORMATS else "jsonl"
+
+
+def export_data(args):
+    """Streams habits or completions to a file (or stdout) as CSV or JSON Lines."""
+    fmt = _format_of(args.out, args.format)
+    with app.app_context():
+        out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+        try:
+            for chunk in transfer.export_rows(_user_id(args.user), args.kind, fmt):
+                out.write(chunk)
+        finally:
+            if args.out:
+                out.close()
+    return 0
+
+
+def import_data(args):
+    """Imports habits or completions from a CSV or JSON Lines file, with progress on stderr."""
+    fmt = _format_of(args.file, args.format)
+
+    def progress(counts):
+        print(f"\r{counts['read']} read, {counts['inserted']} inserted, {counts['skipped']} skipped",
+              end="", file=sys.stderr, flush=True)
+
+    with app.app_context(), open(args.file, encoding="utf-8-sig", newline="") as f:
+        records = transfer.read_records(f, fmt)
+        importer = transfer.import_habits if args.kind == "habits" else transfer.import_completions
+        counts = importer(_user_id(args.user), records, batch_size=args.batch_size, progress=progress)
+    print(file=sys.stderr)
+    print(", ".join(f"{value} {name.replace('_', ' ')}" for name, value in counts.items()))
+    return 0
+
+
+def archive_habits(args):
+    """Moves habits deleted longer ago than the grace period to the archive tables, then compacts."""
+    with app.app_context():
+        grace_days = args.grace_days if args.grace_days is not None else app.config['ARCHIVE_GRACE_DAYS']
+        counts = archive.archive_deleted_habits(grace_days)
+        print(f"Archived {counts['habits']} habits with {counts['entries']} entries "
+              f"(deleted more than {grace_days} days ago).")
+        if counts["habits"] and not args.no_compact:
+            archive.compact_database()
+            print("Database compacted.")
+    return 0
+
+
+def restore_habits(args):
+    """Lists archived habits, or moves the given ones back to the live tables."""
+    with app.app_context():
+        if args.list or not args.archive_ids:
+            rows = archive.list_archived_habits()
+            for archived, entries in rows:
+                print(f"{archived.id:6}  user {archived.user_id}, habit {archived.habit_id:<6} {archived.name}  "
+                      f"({archived.frequency_type}, {entries} entries, deleted {archived.deleted_at:%Y-%m-%d})")
+            print(f"{len(rows)} archived habits.")
+            return 0
+        restored = archive.restore_habits(args.archive_ids)
+        for archive_id, habit_id in restored.items():
+            print(f"Restored archive {archive_id} as habit {habit_id}.")
+        missing = set(args.archive_ids) - set(restored)
+        if missing:
+            print(f"Not in the archive: {', '.join(map(str, sorted(missing)))}")
+            return 1
+    return 0
+
+
+def compact(args):
+    """VACUUM and ANALYZE (SQLite) or VACUUM ANALYZE (PostgreSQL)."""
+    with app.app_context():
+        archive.compact_database()
+        print("Database compacted.")
+    return 0
+
+
+def build_assets(args):
+    """Writes content-hashed, precompressed copies of the JS/CSS files and their manifest."""
+    report = assets.build_assets(app.static_folder, prune=args.prune)
+    for filename, sizes in report.items():
+        variants = ", ".join(f"{encoding} {sizes[encoding]}" for encoding in ("gzip", "br") if sizes[encoding])
+        print(f"{filename} -> {sizes['name']} ({sizes['size']} bytes; {variants or 'not compressed'})")
+    if assets.brotli is None:
+        print("brotli isn't installed, only gzip variants were written.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance commands for the habit tracker.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-stats", help="Recompute streak and completion-count rows")
+    rebuild.add_argument("--habit-id", type=int, help="Only rebuild this habit")
+    rebuild.set_defaults(func=rebuild_stats)
+
+    upgrade = subparsers.add_parser("upgrade-db", help="Create the schema, or missing tables and indexes (run before starting workers)")
+    upgrade.set_defaults(func=upgrade_db)
+
+    plans = subparsers.add_parser("check-plans", help="EXPLAIN the hot queries and fail on full table scans")
+    plans.set_defaults(func=check_plans)
+
+    archiver = subparsers.add_parser("archive", help="Move long-deleted habits and their entries to archive tables")
+    archiver.add_argument("--grace-days", type=int, help="Only habits deleted longer ago (default: ARCHIVE_GRACE_DAYS, 30)")
+    archiver.add_argument("--no-compact", action="store_true", help="Skip VACUUM/ANALYZE afterwards")
+    archiver.set_defaults(func=archive_habits)
+
+    restore = subparsers.add_parser("restore", help="List archived habits or restore them by archive id")
+    restore.add_argument("archive_ids", type=int, nargs="*")
+    restore.add_argument("--list", action="store_true")
+    restore.set_defaults(func=restore_habits)
+
+    compacter = subparsers.add_parser("compact", help="Reclaim free space and refresh planner statistics")
+    compacter.set_defaults(func=compact)
+
+    user = subparsers.add_parser("create-user", help="Add a user and print an API token for them")
+    user.add_argument("name")
+    user.add_argument("--token-name", help="Label for the token, e.g. the device")
+    user.add_argument("--claim-unowned", action="store_true", help="Give them the habits that have no owner yet")
+    user.set_defaults(func=create_user)
+
+    token = subparsers.add_parser("create-token", help="Print a new API token for a user")
+    token.add_argument("name")
+    token.add_argument("--token-name", help="Label for the token, e.g. the device")
+    token.set_defaults(func=create_token)
+
+    export = subparsers.add_parser("export", help="Export habits or completions as CSV or JSON Lines")
+    export.add_argument("kind", choices=list(transfer.FIELDS))
+    export.add_argument("--user", required=True, help="Whose data to export")
+    export.add_argument("--out", help="Output file (default: stdout)")
+    export.add_argument("--format", choices=transfer.FORMATS, help="Default: from the --out extension, else jsonl")
+    export.set_defaults(func=export_data)
+
+    importer = subparsers.add_parser("import", help="Import habits or completions from CSV or JSON Lines")
+    importer.add_argument("kind", choices=list(transfer.FIELDS))
+    importer.add_argument("file")
+    importer.add_argument("--user", required=True, help="Who the imported habits belong to")
+    importer.add_argument("--format", choices=transfer.FORMATS, help="Default: from the file extension, else jsonl")
+    importer.add_argument("--batch-size", type=int, default=transfer.IMPORT_BATCH_SIZE, help="Records per upsert")
+    importer.set_defaults(func=import_data)
+
+    builder = subparsers.add_parser("build-assets", help="Fingerprint and precompress the JS/CSS files (run before starting workers)")
+    builder.add_argument("--prune", action="store_true", help="Delete the files of earlier builds")
+    builder.set_defaults(func=build_assets)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,15 +4,45 @@ from datetime import date, datetime
 
 db = SQLAlchemy()
 
+class User(db.Model):
+    """Owner of habits. Authenticates with ApiTokens."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<User {self.name}>'
+
+class ApiToken(db.Model):
+    """Bearer token of a user. Only a SHA-256 hash of the token is stored."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    name = db.Column(db.String(80), nullable=True) # e.g. the device it was created for
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ApiToken {self.name} of user {self.user_id}>'
+
 class Habit(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True) # Owner
     name = db.Column(db.String(120), nullable=False) # Can include emojis
     frequency_type = db.Column(db.String(20), nullable=False) # 'daily_all', 'daily_weekdays', 'weekly'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_deleted = db.Column(db.Boolean, default=False, nullable=False) # For soft deletes
+    deleted_at = db.Column(db.DateTime, nullable=True) # When it was soft deleted; starts the archive grace period
 
     # Relationship to track completions
     entries = db.relationship('HabitEntry', backref='habit', lazy=True, cascade="all, delete-orphan")
+    # Materialized streak/count summary, kept up to date by services.py
+    stats = db.relationship('HabitStats', backref='habit', uselist=False, lazy=True, cascade="all, delete-orphan")
+
+    # Active-habit listing (GET /api/habits): one user's non-deleted rows, newest first
+    __table_args__ = (
+        db.Index('ix_habit_user_active_created', 'user_id', 'created_at',
+                 sqlite_where=db.text('is_deleted = 0'), postgresql_where=db.text('is_deleted = false')),
+    )
 
     def __repr__(self):
         return f'<Habit {self.name}>'
@@ -23,8 +53,81 @@ class HabitEntry(db.Model):
     completion_date = db.Column(db.Date, nullable=False, default=date.today)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow) # Exact time of completion
 
-    # Ensure a habit can only be marked complete once per day
+    # Ensure a habit can only be marked complete once per day. The constraint's
+    # index on (habit_id, completion_date) also covers every per-habit date-range
+    # lookup, since those only read completion_date.
     __table_args__ = (db.UniqueConstraint('habit_id', 'completion_date', name='_habit_date_uc'),)
 
     def __repr__(self):
-        return f'<HabitEntry {self.habit.name} on {self.completion_date}>'
\ No newline at end of file
+        return f'<HabitEntry {self.habit.name} on {self.completion_date}>'
+
+class HabitStats(db.Model):
+    """Per-habit summary so stats reads don't scan the whole history."""
+    habit_id = db.Column(db.Integer, db.ForeignKey('habit.id'), primary_key=True)
+    current_streak = db.Column(db.Integer, default=0, nullable=False) # Length of the run ending at last_period
+    best_streak = db.Column(db.Integer, default=0, nullable=False)
+    total_completions = db.Column(db.Integer, default=0, nullable=False)
+    last_completion_date = db.Column(db.Date, nullable=True)
+    last_period = db.Column(db.Integer, nullable=True) # Frequency-rule period ordinal of the latest counted completion
+
+    def __repr__(self):
+        return f'<HabitStats {self.habit_id}: {self.current_streak}/{self.best_streak}>'
+
+class DataVersion(db.Model):
+    """Per-user counter bumped on every write to the user's habits or entries; drives ETags and the response cache."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (db.Index('ix_data_version_user', 'user_id', unique=True),) # One row per user
+
+    def __repr__(self):
+        return f'<DataVersion {self.version}>'
+
+class HabitChange(db.Model):
+    """Which habits changed at which of their user's data versions; feeds GET /api/habits/changes."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    version = db.Column(db.Integer, nullable=False)
+    habit_id = db.Column(db.Integer, nullable=True) # NULL: everything may have changed (e.g. seeding)
+
+    __table_args__ = (db.Index('ix_habit_change_user_version', 'user_id', 'version'),)
+
+    def __repr__(self):
+        return f'<HabitChange v{self.version} habit {self.habit_id}>'
+
+class ImportedHabit(db.Model):
+    """Which habit an imported habit record became: its id in the exported file -> the id it was inserted with."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    source_id = db.Column(db.Integer, nullable=False) # The "id" of the import record
+    habit_id = db.Column(db.Integer, db.ForeignKey('habit.id'), nullable=False) # Dropped when the habit is archived
+
+    __table_args__ = (db.Index('ix_imported_habit_user_source', 'user_id', 'source_id', unique=True),)
+
+    def __repr__(self):
+        return f'<ImportedHabit {self.source_id} -> {self.habit_id}>'
+
+class ArchivedHabit(db.Model):
+    """A soft-deleted habit moved out of the live tables by `manage.py archive`."""
+    id = db.Column(db.Integer, primary_key=True)
+    habit_id = db.Column(db.Integer, nullable=False) # The id it had in the habit table (SQLite may reuse it)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
+    name = db.Column(db.String(120), nullable=False)
+    frequency_type = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime)
+    deleted_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ArchivedHabit {self.name}>'
+
+class ArchivedHabitEntry(db.Model):
+    """A completion of an archived habit."""
+    id = db.Column(db.Integer, primary_key=True)
+    archived_habit_id = db.Column(db.Integer, db.ForeignKey('archived_habit.id'), nullable=False, index=True)
+    completion_date = db.Column(db.Date, nullable=False)
+    timestamp = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ArchivedHabitEntry {self.archived_habit_id} on {self.completion_date}>'
@@ -1,25 +1,39 @@
 # seed.py
 
+import argparse
 import random
-from datetime import date, timedelta
-from app import app, db  # Import your Flask app and db instance
-from models import Habit, HabitEntry # Import your database models
+import time
+from datetime import datetime, timedelta
+from app import create_app
+from models import db, User, Habit, HabitEntry, HabitStats, ImportedHabit # Import your database models
+from services import insert_completions, rebuild_habit_stats, stats_values, bump_data_version
+from clock import local_today
+import auth
 
-def seed_database():
-    """Populates the database with sample habits and past entries."""
+app = create_app()
 
-    with app.app_context(): # IMPORTANT: Operations must be within the app context
-        print("Seeding database...")
+FREQUENCIES = ['daily_all', 'daily_weekdays', 'weekly']
+
+
+def get_or_create_user(name: str):
+    """The user's id, creating them (and printing their first API token) if needed."""
+    user_id = db.session.scalar(db.select(User.id).filter(User.name == name))
+    if user_id is None:
+        user_id = auth.create_user(name).id
+        token = auth.create_token(user_id, name="seed")
+        db.session.commit()
+        print(f"Created user {name}, API token: {token}")
+    return user_id
 
-        # --- Optional: Clear existing data ---
-        # Uncomment these lines if you want to start fresh each time you seed
-        # print("Clearing existing data...")
-        # HabitEntry.query.delete()
-        # Habit.query.delete()
-        # db.session.commit()
-        # print("Existing data cleared.")
-        # --- End Optional Clear ---
 
+def seed_database(seed=None, user_name: str = "demo"):
+    """Populates the database with sample habits and past entries for a user."""
+    rng = random.Random(seed) # Same seed, same history
+
+    with app.app_context(): # IMPORTANT: Operations must be within the app context
+        db.create_all() # A fresh database has no tables yet
+        user_id = get_or_create_user(user_name)
+        print("Seeding database...")
 
         # --- Define Sample Habits ---
         habits_data = [
@@ -33,11 +47,13 @@ def seed_database():
         # --- Create Habit Objects ---
         created_habits = []
         print("Creating habits...")
+        existing = {h.name: h for h in Habit.query.filter(Habit.user_id == user_id,
+                                                          Habit.name.in_([d["name"] for d in habits_data])).all()}
         for data in habits_data:
-            # Check if habit already exists (to avoid duplicates if not clearing)
-            existing_habit = Habit.query.filter_by(name=data["name"]).first()
+            # Reuse habits that already exist (to avoid duplicates if not clearing)
+            existing_habit = existing.get(data["name"])
             if not existing_habit:
-                habit = Habit(name=data["name"], frequency_type=data["frequency_type"])
+                habit = Habit(user_id=user_id, name=data["name"], frequency_type=data["frequency_type"])
                 db.session.add(habit)
                 created_habits.append(habit) # Keep track if newly created
             else:
@@ -56,12 +72,11 @@ def seed_database():
 
         # --- Generate Past Habit Entries ---
         print("Generating past habit entries...")
-        today = date.today()
+        today = local_today()
         num_days_history = 90 # Go back 90 days
 
+        pairs = set()
         for habit in created_habits: # Use the list of created/existing habits
-            print(f"  Generating entries for: {habit.name} ({habit.frequency_type})")
-            entries_added = 0
             for i in range(num_days_history):
                 entry_date = today - timedelta(days=i)
                 should_add = False
@@ -69,47 +84,29 @@ def seed_database():
                 # Determine if an entry should potentially exist based on frequency
                 if habit.frequency_type == "daily_all":
                     # Simulate missing days randomly (e.g., 85% completion rate)
-                    if random.random() < 0.85:
-                        should_add = True
+                    should_add = rng.random() < 0.85
                 elif habit.frequency_type == "daily_weekdays":
-                    # Only add on weekdays (Mon-Fri, weekday() is 0-4)
-                    if entry_date.weekday() < 5:
-                        # Simulate missing days randomly (e.g., 90% completion rate on weekdays)
-                         if random.random() < 0.90:
-                            should_add = True
+                    # Only add on weekdays (Mon-Fri), ~90% completion rate
+                    should_add = entry_date.weekday() < 5 and rng.random() < 0.90
                 elif habit.frequency_type == "weekly":
-                     # Add roughly once a week, e.g., only on Sundays (weekday() == 6)
-                     if entry_date.weekday() == 6:
-                         # Simulate missing a week occasionally (e.g., 80% completion rate on the target day)
-                         if random.random() < 0.80:
-                             should_add = True
+                    # Add roughly once a week, on Sundays, ~80% of weeks
+                    should_add = entry_date.weekday() == 6 and rng.random() < 0.80
 
                 # Specific logic for 'Read Book' - make it sparser
                 if habit.name == "📚 Read Book":
-                     if random.random() < 0.25: # Only 25% chance even if 'daily_all'
-                         should_add = True
-                     else:
-                         should_add = False # Override previous daily check
-
+                    should_add = rng.random() < 0.25 # Override previous daily check
 
                 if should_add:
-                    # Check if entry already exists for this specific habit and date
-                    existing_entry = HabitEntry.query.filter_by(
-                        habit_id=habit.id,
-                        completion_date=entry_date
-                    ).first()
+                    pairs.add((habit.id, entry_date))
 
-                    if not existing_entry:
-                        entry = HabitEntry(habit_id=habit.id, completion_date=entry_date)
-                        db.session.add(entry)
-                        entries_added += 1
-
-            print(f"    Added {entries_added} entries for {habit.name}.")
-
-        # Commit all the new entries
+        # One upsert for everything; existing entries are skipped by _habit_date_uc
         try:
+            inserted = insert_completions(pairs)
+            for habit in created_habits:
+                rebuild_habit_stats(habit)
+            bump_data_version(user_id) # Invalidate cached responses of a running server
             db.session.commit()
-            print("Habit entries committed successfully.")
+            print(f"Added {len(inserted)} entries ({len(pairs) - len(inserted)} already existed).")
         except Exception as e:
             db.session.rollback()
             print(f"Error committing entries: {e}")
@@ -117,5 +114,149 @@ def seed_database():
         print("Database seeding finished.")
 
 
+# --- Synthetic-Scale Dataset Generator ---
+
+def draw_rate(rng: random.Random, distribution: str, low: float, high: float):
+    """Completion rate for one habit."""
+    if distribution == "fixed":
+        return high
+    if distribution == "beta":
+        # Skewed towards high rates, like most real habit trackers
+        return low + (high - low) * rng.betavariate(5, 2)
+    return rng.uniform(low, high)
+
+
+def generate_completion_dates(rng: random.Random, frequency_type: str, calendar, rate: float):
+    """Completion dates (ascending) for one habit. calendar is [(date, is_weekday), ...] ascending."""
+    random_ = rng.random
+    if frequency_type == "weekly":
+        # One random day per ISO week, `rate` of the weeks
+        start, end = calendar[0][0], calendar[-1][0]
+        week_start = start - timedelta(days=start.weekday())
+        dates = []
+        while week_start <= end:
+            if random_() < rate:
+                d = week_start + timedelta(days=rng.randrange(7))
+                if start <= d <= end:
+                    dates.append(d)
+            week_start += timedelta(days=7)
+        return dates
+    if frequency_type == "daily_weekdays":
+        return [d for d, is_weekday in calendar if is_weekday and random_() < rate]
+    return [d for d, _ in calendar if random_() < rate]
+
+
+def generate_dataset(habits: int, days: int, distribution: str = "uniform", rate_min: float = 0.3,
+                     rate_max: float = 0.95, seed: int = 0, chunk_size: int = 50000, clear: bool = False,
+                     user_name: str = "demo"):
+    """Writes `habits` synthetic habits of a user with `days` days of history using bulk core inserts."""
+    rng = random.Random(seed)
+    entry_table = HabitEntry.__table__
+    stats_table = HabitStats.__table__
+
+    with app.app_context():
+        today = local_today() # In the configured TIMEZONE
+        start = today - timedelta(days=days - 1)
+        created_at = datetime.combine(start, datetime.min.time())
+        calendar = [(d, d.weekday() < 5) for d in (start + timedelta(days=i) for i in range(days))]
+        started = time.perf_counter()
+        db.create_all() # A fresh database has no tables yet
+        user_id = get_or_create_user(user_name)
+        if clear:
+            owned = db.select(Habit.id).where(Habit.user_id == user_id)
+            db.session.execute(stats_table.delete().where(stats_table.c.habit_id.in_(owned)))
+            db.session.execute(entry_table.delete().where(entry_table.c.habit_id.in_(owned)))
+            db.session.execute(ImportedHabit.__table__.delete().where(ImportedHabit.user_id == user_id))
+            db.session.execute(Habit.__table__.delete().where(Habit.user_id == user_id))
+            db.session.commit()
+            print(f"Existing data of {user_name} cleared.")
+
+        # Habits first, ids come back in parameter order
+        habit_rows = [{
+            "user_id": user_id,
+            "name": f"Habit {i + 1}",
+            "frequency_type": rng.choices(FREQUENCIES, weights=(6, 3, 1))[0],
+            "created_at": created_at,
+            "is_deleted": False,
+        } for i in range(habits)]
+        habit_ids = db.session.scalars(
+            Habit.__table__.insert().returning(Habit.__table__.c.id, sort_by_parameter_order=True),
+            habit_rows
+        ).all()
+
+        # Raw DBAPI executemany: SQLAlchemy's per-row parameter processing would dominate
+        connection = db.session.connection()
+        dialect = connection.dialect
+        insert_sql = str(entry_table.insert().compile(
+            dialect=dialect, column_keys=["habit_id", "completion_date", "timestamp"]))
+        if dialect.name == "sqlite":
+            # Same text format the SQLAlchemy Date/DateTime types store
+            day_param = {d: d.isoformat() for d, _ in calendar}
+            timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+        else:
+            day_param = {d: d for d, _ in calendar}
+            timestamp = datetime.utcnow()
+
+        def flush(rows):
+            if dialect.positional:
+                connection.exec_driver_sql(insert_sql, rows)
+            else:
+                connection.exec_driver_sql(insert_sql, [
+                    {"habit_id": h, "completion_date": d, "timestamp": t} for h, d, t in rows])
+
+        buffer = []
+        stats_rows = []
+        total_entries = 0
+        for habit_id, habit_row in zip(habit_ids, habit_rows):
+            frequency_type = habit_row["frequency_type"]
+            rate = draw_rate(rng, distribution, rate_min, rate_max)
+            dates = generate_completion_dates(rng, frequency_type, calendar, rate)
+            buffer.extend((habit_id, day_param[d], timestamp) for d in dates)
+            stats_rows.append({"habit_id": habit_id, **stats_values(dates, frequency_type)})
+            if len(buffer) >= chunk_size:
+                flush(buffer)
+                total_entries += len(buffer)
+                buffer = []
+        if buffer:
+            flush(buffer)
+            total_entries += len(buffer)
+
+        # Materialized stats are computed from the generated dates, no re-read needed
+        for i in range(0, len(stats_rows), chunk_size):
+            db.session.execute(stats_table.insert(), stats_rows[i:i + chunk_size])
+        bump_data_version(user_id) # Invalidate cached responses of a running server
+        db.session.commit()
+
+        elapsed = time.perf_counter() - started
+        print(f"Generated {len(habit_ids)} habits and {total_entries} entries in {elapsed:.1f}s "
+              f"({total_entries / max(elapsed, 1e-9):,.0f} entries/s).")
+        return total_entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the habit database.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible data")
+    parser.add_argument("--user", default="demo", help="Whose habits to create (created if missing)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    generate = subparsers.add_parser("generate", help="Bulk-generate a synthetic dataset at scale")
+    generate.add_argument("--habits", type=int, default=100, help="Number of habits to create")
+    generate.add_argument("--days", type=int, default=365, help="Days of history per habit")
+    generate.add_argument("--distribution", choices=["uniform", "beta", "fixed"], default="uniform",
+                          help="How per-habit completion rates are drawn between --rate-min and --rate-max")
+    generate.add_argument("--rate-min", type=float, default=0.3)
+    generate.add_argument("--rate-max", type=float, default=0.95)
+    generate.add_argument("--chunk-size", type=int, default=50000, help="Rows per bulk insert")
+    generate.add_argument("--clear", action="store_true", help="Delete the user's habits and entries first")
+    generate.add_argument("--seed", type=int, default=argparse.SUPPRESS, help="Random seed for reproducible data")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate_dataset(args.habits, args.days, args.distribution, args.rate_min, args.rate_max,
+                         seed=args.seed or 0, chunk_size=args.chunk_size, clear=args.clear, user_name=args.user)
+    else:
+        seed_database(args.seed, args.user)
+
+
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    main()
@@ -1,168 +1,391 @@
 # services.py
 from datetime import date, timedelta
-from models import Habit, HabitEntry, db # Assuming models.py is in the same directory
+from models import Habit, HabitEntry, HabitStats, DataVersion, HabitChange, db # Assuming models.py is in the same directory
+from frequency import get_frequency_rule, compute_streaks, scan_runs, current_streak_for
+
+def user_habits(user_id: int):
+    """Query of the user's habits (deleted ones included). Every habit lookup goes through here."""
+    return Habit.query.filter(Habit.user_id == user_id)
+
+
+def get_user_habit(user_id: int, habit_id: int):
+    """The user's habit with that id, or None (also when it belongs to someone else)."""
+    return user_habits(user_id).filter(Habit.id == habit_id).first()
+
+
+def get_habit_status_for_day(habit: Habit, target_date: date):
+    """Determines if a habit is pending, done today, or done this week.
+
+    target_date is the user's today (see clock.local_today), passed in explicitly.
+    """
+    return get_habit_statuses_for_day([habit], target_date)[habit.id]
+
+
+def get_habit_statuses_for_day(habits, target_date: date):
+    """Determines the status of every habit in one go.
+
+    Returns a dict of habit id -> status. All completions for the current week
+    are fetched with a single grouped query instead of one or two per habit.
+    """
+    if not habits:
+        return {}
 
-def get_habit_status_for_day(habit: Habit, target_date: date = date.today()):
-    """Determines if a habit is pending, done today, or done this week."""
     start_of_week = target_date - timedelta(days=target_date.weekday()) # Monday is 0
 
-    # Check if completed today
-    completed_today = HabitEntry.query.filter_by(
-        habit_id=habit.id,
-        completion_date=target_date
-    ).first() is not None
+    # Latest completion this week (up to target_date) for each habit
+    rows = db.session.query(
+        HabitEntry.habit_id,
+        db.func.max(HabitEntry.completion_date)
+    ).filter(
+        HabitEntry.habit_id.in_([habit.id for habit in habits]),
+        HabitEntry.completion_date >= start_of_week,
+        HabitEntry.completion_date <= target_date # Up to today
+    ).group_by(HabitEntry.habit_id).all()
+    last_this_week = dict(rows)
 
-    if completed_today:
+    is_weekday = target_date.weekday() < 5 # Monday=0, Friday=4
+
+    statuses = {}
+    for habit in habits:
+        last_completed = last_this_week.get(habit.id)
+        statuses[habit.id] = _status_from_last_completion(habit, last_completed, target_date, is_weekday)
+    return statuses
+
+
+def _status_from_last_completion(habit: Habit, last_completed, target_date: date, is_weekday: bool):
+    """Maps the most recent completion this week to a status bucket."""
+    if last_completed == target_date:
         return "done_today"
 
-    # If weekly, check if completed this week (and not today)
-    if habit.frequency_type == 'weekly':
-        completed_this_week = HabitEntry.query.filter(
-            HabitEntry.habit_id == habit.id,
-            HabitEntry.completion_date >= start_of_week,
-            HabitEntry.completion_date <= target_date # Up to today
-        ).first() is not None
-        if completed_this_week:
-             # Considered done this week if completed on a previous day of the week
-            return "done_this_week"
-
-    # Check if the habit should be pending today
-    is_weekday = target_date.weekday() < 5 # Monday=0, Friday=4
+    # If weekly, a completion on a previous day of the week counts
+    if habit.frequency_type == 'weekly' and last_completed is not None:
+        return "done_this_week"
 
     if habit.frequency_type == 'daily_all':
         return "pending"
     elif habit.frequency_type == 'daily_weekdays' and is_weekday:
         return "pending"
     elif habit.frequency_type == 'weekly':
-         # Weekly tasks are always pending at the start of the week until completed
-         # If not completed_this_week and not completed_today, it's pending
+        # Weekly tasks are always pending at the start of the week until completed
         return "pending"
     else:
         # e.g., It's a weekend and the habit is weekdays only
         return "not_applicable_today" # Or some other status
 
 
-def calculate_streaks(habit_id: int):
-    """Calculates the current and best streaks for a habit."""
-    entries = HabitEntry.query.filter_by(habit_id=habit_id)\
-                              .order_by(HabitEntry.completion_date.desc())\
-                              .all()
-
-    if not entries:
-        return {"current_streak": 0, "best_streak": 0, "completion_dates": []}
-
-    habit = Habit.query.get(habit_id)
+def calculate_streaks(user_id: int, habit_id: int, today: date):
+    """Calculates the current and best streaks for one of the user's habits as of their today."""
+    habit = get_user_habit(user_id, habit_id)
     if not habit:
         return {"current_streak": 0, "best_streak": 0, "completion_dates": []}
 
-    completion_dates = sorted([e.completion_date for e in entries])
-    if not completion_dates:
-         return {"current_streak": 0, "best_streak": 0, "completion_dates": []}
+    # Only the dates are needed, already sorted and unique (see _habit_date_uc)
+    completion_dates = db.session.scalars(
+        db.select(HabitEntry.completion_date)
+          .filter(HabitEntry.habit_id == habit_id)
+          .order_by(HabitEntry.completion_date)
+    ).all()
+
+    rule = get_frequency_rule(habit.frequency_type)
+    streaks = compute_streaks(completion_dates, rule, today)
 
+    return {
+        "current_streak": streaks["current_streak"],
+        "best_streak": streaks["best_streak"],
+        "completion_dates": [d.isoformat() for d in completion_dates] # Return dates as strings
+    }
 
-    today = date.today()
-    current_streak = 0
-    best_streak = 0
-    current_run = 0
 
-    # Calculate current streak
-    temp_streak = 0
-    last_date = None # Keep track of the last date checked
+def month_bounds(year: int, month: int):
+    """First and last day of a calendar month."""
+    first = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return first, next_month - timedelta(days=1)
 
-    # Check from today backwards
-    check_date = today
-    is_first_check = True # Handle case where today is the first completion day
 
-    # Determine the decrement logic based on frequency
-    if habit.frequency_type == 'daily_all':
-        decrement = lambda d: d - timedelta(days=1)
-        is_valid_day = lambda d: True
-    elif habit.frequency_type == 'daily_weekdays':
-        decrement = lambda d: d - timedelta(days=1)
-        is_valid_day = lambda d: d.weekday() < 5
-    elif habit.frequency_type == 'weekly':
-        # For weekly, we check if *any* day in the previous week was completed
-        # This logic is more complex - simplified for now: check if *last monday* had a completion in its week
-        # A more robust weekly streak might need a different definition (e.g., completed every week without fail)
-        # Simplified: treat as daily for streak calculation for now
-        decrement = lambda d: d - timedelta(days=1)
-        is_valid_day = lambda d: True # Simplified weekly streak
-    else:
-         decrement = lambda d: d - timedelta(days=1)
-         is_valid_day = lambda d: True
-
-    # Check current streak working backwards from today/yesterday
-    yesterday = today - timedelta(days=1)
-    # Start checking from today only if it was completed today or yesterday
-    # and it was a valid day for the habit
-    initial_check_date = None
-    if today in completion_dates and is_valid_day(today):
-        initial_check_date = today
-    elif yesterday in completion_dates and is_valid_day(yesterday):
-         initial_check_date = yesterday
-
-    if initial_check_date:
-        check_date = initial_check_date
-        while True:
-             if is_valid_day(check_date):
-                 if check_date in completion_dates:
-                     temp_streak += 1
-                 else:
-                     break # Streak broken
-             # Move to the previous day regardless of validity,
-             # but only count valid days where it was completed.
-             check_date = decrement(check_date)
-             # Safety break (e.g., don't go back indefinitely if logic is flawed)
-             if check_date < completion_dates[0] - timedelta(days=1):
-                 break
-        current_streak = temp_streak
-
-
-    # Calculate best streak iterating through all completion dates
-    if completion_dates:
-        best_run = 0
-        current_run = 0
-        expected_date = None
-
-        # Sort dates ascending for best streak calculation
-        sorted_dates = sorted(list(set(completion_dates))) # Unique dates, sorted
-
-        for i, current_date in enumerate(sorted_dates):
-             # Skip if not a valid day for the habit type (e.g., weekend for weekdays)
-             if not is_valid_day(current_date):
-                 continue
-
-             if i == 0: # First entry starts a run of 1
-                 current_run = 1
-             else:
-                 # Determine the expected previous date based on frequency
-                 prev_date_in_list = sorted_dates[i-1]
-                 # Find the *actual* previous valid day before current_date
-                 expected_prev_date = current_date
-                 while True:
-                     expected_prev_date = decrement(expected_prev_date)
-                     if is_valid_day(expected_prev_date):
-                         break
-                     # Safety break
-                     if expected_prev_date < sorted_dates[0] - timedelta(days=1):
-                         break
-
-
-                 if prev_date_in_list == expected_prev_date:
-                     # Dates are consecutive according to frequency rules
-                     current_run += 1
-                 else:
-                     # Streak broken, start new run
-                      best_run = max(best_run, current_run)
-                      current_run = 1 # Start new streak
-
-             best_run = max(best_run, current_run) # Update best run at the end of each iteration
-
-        best_streak = best_run
+def get_completion_bitmaps(habit_id: int, start: date, end: date):
+    """Completions between start and end (inclusive) as per-month bitmaps.
+
+    Returns {"YYYY-MM": bits} where bit (day - 1) is set when the habit was completed
+    on that day. Only months with at least one completion are included.
+    """
+    completion_dates = db.session.scalars(
+        db.select(HabitEntry.completion_date)
+          .filter(HabitEntry.habit_id == habit_id,
+                  HabitEntry.completion_date >= start,
+                  HabitEntry.completion_date <= end)
+    )
+    months = {}
+    for d in completion_dates:
+        key = f"{d.year:04d}-{d.month:02d}"
+        months[key] = months.get(key, 0) | (1 << (d.day - 1))
+    return months
+
+
+# --- Data Version ---
+
+CHANGE_LOG_VERSIONS = 1000 # How many versions of habit changes are kept for the changes feed
 
+def get_data_version(user_id: int):
+    """The user's current data version (0 before their first write)."""
+    return db.session.scalar(db.select(DataVersion.version).filter(DataVersion.user_id == user_id)) or 0
 
+
+def bump_data_version(user_id: int, habit_ids=None):
+    """Increments the user's data version in the current transaction and returns it. Call on every write.
+
+    habit_ids are the habits the write touched, for the changes feed; None means
+    any of the user's habits may have changed and clients should reload everything.
+    """
+    table = DataVersion.__table__
+    updated = db.session.execute(
+        table.update().where(table.c.user_id == user_id).values(version=table.c.version + 1)
+    ).rowcount
+    if not updated:
+        db.session.execute(table.insert().values(user_id=user_id, version=1))
+    version = get_data_version(user_id)
+
+    changes = [{"user_id": user_id, "version": version, "habit_id": habit_id} for habit_id in (habit_ids or [None])]
+    db.session.execute(HabitChange.__table__.insert(), changes)
+    # Keep the change log bounded; older clients just reload everything
+    db.session.execute(HabitChange.__table__.delete().where(
+        HabitChange.user_id == user_id, HabitChange.version <= version - CHANGE_LOG_VERSIONS))
+    return version
+
+
+def get_changes_since(user_id: int, since: int):
+    """The user's habit ids changed after version `since`, or None when the client has to reload everything."""
+    current = get_data_version(user_id)
+    if since > current or since < current - CHANGE_LOG_VERSIONS:
+        return None # Unknown or older than the retained log
+    rows = db.session.scalars(
+        db.select(HabitChange.habit_id).filter(HabitChange.user_id == user_id, HabitChange.version > since)
+    ).all()
+    if None in rows:
+        return None # A bulk write that didn't record habit ids
+    return sorted(set(rows))
+
+
+# --- Materialized Stats ---
+
+def stats_values(completion_dates, frequency_type: str):
+    """Column values of a HabitStats row for unique completion dates sorted ascending."""
+    best_run, run, last_period = scan_runs(completion_dates, get_frequency_rule(frequency_type))
     return {
-        "current_streak": current_streak,
-        "best_streak": best_streak,
-        "completion_dates": [d.isoformat() for d in completion_dates] # Return dates as strings
-    }
\ No newline at end of file
+        "current_streak": run,
+        "best_streak": best_run,
+        "total_completions": len(completion_dates),
+        "last_completion_date": completion_dates[-1] if completion_dates else None,
+        "last_period": last_period,
+    }
+
+
+def rebuild_habit_stats(habit: Habit):
+    """Recomputes a habit's stats row from its full history (backfill/repair)."""
+    completion_dates = db.session.scalars(
+        db.select(HabitEntry.completion_date)
+          .filter(HabitEntry.habit_id == habit.id)
+          .order_by(HabitEntry.completion_date)
+    ).all()
+
+    stats = habit.stats
+    if stats is None:
+        stats = HabitStats(habit_id=habit.id)
+        habit.stats = stats
+    for column, value in stats_values(completion_dates, habit.frequency_type).items():
+        setattr(stats, column, value)
+    return stats
+
+
+def rebuild_all_stats():
+    """Rebuilds the stats row of every habit. Returns how many were rebuilt.
+
+    Bumps each owner's data version, so running workers stop serving cached
+    responses with the old numbers.
+    """
+    count = 0
+    by_user = {} # user id -> rebuilt habit ids
+    for habit in Habit.query.order_by(Habit.id).all():
+        rebuild_habit_stats(habit)
+        by_user.setdefault(habit.user_id, []).append(habit.id)
+        count += 1
+    for user_id, habit_ids in by_user.items():
+        if user_id is not None: # Unowned habits (not claimed yet) aren't served
+            bump_data_version(user_id, habit_ids)
+    db.session.commit()
+    return count
+
+
+def get_or_build_stats(habit: Habit):
+    """Returns the habit's stats row, building it if it has never been materialized."""
+    if habit.stats is None:
+        rebuild_habit_stats(habit)
+        db.session.commit()
+    return habit.stats
+
+
+def record_completion(habit: Habit, completion_date: date):
+    """Updates the stats row after a new entry was added (entry must be flushed)."""
+    stats = habit.stats
+    if stats is None:
+        return rebuild_habit_stats(habit)
+
+    rule = get_frequency_rule(habit.frequency_type)
+    stats.total_completions += 1
+    if stats.last_completion_date is None or completion_date > stats.last_completion_date:
+        stats.last_completion_date = completion_date
+
+    if not rule.applies_to(completion_date):
+        return stats # Counts as a completion, not towards the streak
+
+    period = rule.period_of(completion_date)
+    if stats.last_period is None or period > stats.last_period + 1:
+        stats.current_streak = 1 # Streak broken, start new run
+        stats.last_period = period
+    elif period == stats.last_period + 1:
+        stats.current_streak += 1
+        stats.last_period = period
+    elif period < stats.last_period:
+        # Backfilled into the past: may join earlier runs, recompute
+        return rebuild_habit_stats(habit)
+    # else: same period as the latest completion (e.g., twice in one week)
+
+    stats.best_streak = max(stats.best_streak, stats.current_streak)
+    return stats
+
+
+def record_uncompletion(habit: Habit, completion_date: date):
+    """Updates the stats row after an entry was removed (deletion must be flushed)."""
+    stats = habit.stats
+    rule = get_frequency_rule(habit.frequency_type)
+    if stats is None or (rule.applies_to(completion_date) and stats.last_period is not None
+                         and rule.period_of(completion_date) <= stats.last_period):
+        # Removing a counted day can split a run or shrink the best one, recompute
+        return rebuild_habit_stats(habit)
+
+    stats.total_completions -= 1
+    if completion_date == stats.last_completion_date:
+        stats.last_completion_date = db.session.scalar(
+            db.select(db.func.max(HabitEntry.completion_date))
+              .filter(HabitEntry.habit_id == habit.id)
+        )
+    return stats
+
+
+def record_completions(habit: Habit, completion_dates):
+    """Updates the stats row after several entries were added at once (entries must be flushed)."""
+    completion_dates = sorted(completion_dates)
+    stats = habit.stats
+    rule = get_frequency_rule(habit.frequency_type)
+    backfilled = any(
+        rule.applies_to(d) and stats.last_period is not None and rule.period_of(d) < stats.last_period
+        for d in completion_dates
+    ) if stats is not None else True
+    if backfilled:
+        return rebuild_habit_stats(habit) # One rebuild instead of one per date
+    for d in completion_dates:
+        record_completion(habit, d)
+    return stats
+
+
+def get_stats_summary(habit: Habit, today: date):
+    """Streaks and totals from the materialized row, O(1) in history length."""
+    stats = get_or_build_stats(habit)
+    rule = get_frequency_rule(habit.frequency_type)
+    return {
+        "current_streak": current_streak_for(rule, stats.current_streak, stats.last_period, today),
+        "best_streak": stats.best_streak,
+        "total_completions": stats.total_completions,
+        "last_completion_date": stats.last_completion_date,
+    }
+
+
+# --- Bulk Completions ---
+
+def insert_completions(pairs):
+    """Inserts (habit_id, completion_date) pairs in one statement, skipping ones that exist.
+
+    Uses INSERT ... ON CONFLICT DO NOTHING on _habit_date_uc and returns the set
+    of pairs that were actually inserted.
+    """
+    if not pairs:
+        return set()
+    rows = [{"habit_id": habit_id, "completion_date": d} for habit_id, d in pairs]
+    table = HabitEntry.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).on_conflict_do_nothing(index_elements=['habit_id', 'completion_date'])
+        result = db.session.execute(stmt.returning(table.c.habit_id, table.c.completion_date), rows)
+        return {(habit_id, d) for habit_id, d in result}
+
+    # Other backends: look up what already exists, then plain insert the rest
+    existing = set(db.session.execute(
+        db.select(table.c.habit_id, table.c.completion_date).filter(
+            db.tuple_(table.c.habit_id, table.c.completion_date).in_(list(pairs)))
+    ).all())
+    new_rows = [row for row in rows if (row["habit_id"], row["completion_date"]) not in existing]
+    if new_rows:
+        db.session.execute(table.insert(), new_rows)
+    return {(row["habit_id"], row["completion_date"]) for row in new_rows}
+
+
+def bulk_complete(user_id: int, items, today: date):
+    """Marks many (habit_id, date) pairs of the user's habits complete in a single transaction.
+
+    items is a list of {"habit_id": int, "date": "YYYY-MM-DD"} dicts. Returns one
+    result per item, in order, with status 'created', 'already_completed',
+    'not_found' (also for other users' habits) or 'invalid' (also for days after
+    today: this backfills, it doesn't pre-complete). The caller commits.
+    """
+    results = []
+    parsed = []
+    for item in items:
+        try:
+            habit_id = int(item["habit_id"])
+            completion_date = date.fromisoformat(item["date"])
+            if completion_date > today:
+                raise ValueError("future date")
+        except (KeyError, TypeError, ValueError):
+            results.append({"habit_id": item.get("habit_id") if isinstance(item, dict) else None,
+                            "date": item.get("date") if isinstance(item, dict) else None,
+                            "status": "invalid"})
+            parsed.append(None)
+            continue
+        results.append({"habit_id": habit_id, "date": completion_date.isoformat(), "status": None})
+        parsed.append((habit_id, completion_date))
+
+    habit_ids = {pair[0] for pair in parsed if pair}
+    habits = {}
+    if habit_ids:
+        active = Habit.query.options(db.joinedload(Habit.stats)) \
+                            .filter(Habit.user_id == user_id, Habit.id.in_(habit_ids),
+                                    Habit.is_deleted == False).all()
+        habits = {h.id: h for h in active}
+
+    wanted = {pair for pair in parsed if pair and pair[0] in habits}
+    inserted = insert_completions(wanted)
+
+    # Keep the materialized stats in step, once per touched habit
+    by_habit = {}
+    for habit_id, d in inserted:
+        by_habit.setdefault(habit_id, []).append(d)
+    for habit_id, dates in by_habit.items():
+        record_completions(habits[habit_id], dates)
+
+    claimed = set()
+    for result, pair in zip(results, parsed):
+        if pair is None:
+            continue
+        if pair[0] not in habits:
+            result["status"] = "not_found"
+        elif pair in inserted and pair not in claimed:
+            result["status"] = "created"
+            claimed.add(pair) # A duplicate later in the same batch reports already_completed
+        else:
+            result["status"] = "already_completed"
+    return results
@@ -1,4 +1,7 @@
 document.addEventListener('DOMContentLoaded', () => {
+    // The server resolves "today" from this timezone (also sent by EventSource, which can't set headers)
+    document.cookie = `tz=${Intl.DateTimeFormat().resolvedOptions().timeZone}; path=/; SameSite=Lax`;
+
     const habitDataElement = document.getElementById('habit-data');
     const habitId = habitDataElement.dataset.habitId;
 
@@ -14,17 +17,26 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
     let currentDisplayDate = new Date(); // Start with the current month
-    let allCompletionDates = []; // Store all fetched dates
+    const completionMonths = new Map(); // "YYYY-MM" -> completion bitmap, only for months already fetched
+    const CATCH_UP_INTERVAL_MS = 60000; // Polling fallback for changes live events don't deliver
 
     // --- Functions ---
 
+    const monthKey = (dateObj) => `${dateObj.getFullYear()}-${String(dateObj.getMonth() + 1).padStart(2, '0')}`;
+
     const fetchHabitStats = async () => {
         if (!habitId) {
             console.error("Habit ID not found");
             return;
         }
+        const key = monthKey(currentDisplayDate);
+        if (completionMonths.has(key)) {
+            renderCalendar(currentDisplayDate); // Month already loaded
+            return;
+        }
         try {
-            const response = await fetch(`/api/habits/${habitId}/stats`);
+            // Only ask for the month being displayed
+            const response = await fetch(`/api/habits/${habitId}/stats?month=${key}`);
             if (!response.ok) {
                  throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -36,8 +48,8 @@ document.addEventListener('DOMContentLoaded', () => {
             bestStreakElement.textContent = stats.best_streak || 0;
             goalsMetElement.textContent = stats.goals_met || 0; // Or total completions
 
-            // Store completion dates and render initial calendar
-            allCompletionDates = stats.completion_dates || [];
+            // Store this month's completion bitmap and render the calendar
+            completionMonths.set(key, (stats.completion_months || {})[key] || 0);
             renderCalendar(currentDisplayDate);
 
         } catch (error) {
@@ -63,6 +75,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const lastDayOfMonth = new Date(year, month + 1, 0);
         const daysInMonth = lastDayOfMonth.getDate();
         const startDayOfWeek = firstDayOfMonth.getDay(); // 0=Sun, 1=Mon, ..., 6=Sat
+        const completedBits = completionMonths.get(monthKey(dateToShow)) || 0; // Bit (day - 1) set when completed
 
         // Add empty cells for days before the 1st of the month
         for (let i = 0; i < startDayOfWeek; i++) {
@@ -99,8 +112,8 @@ document.addEventListener('DOMContentLoaded', () => {
             // console.log(`Day: ${day}, Current Date Obj: ${currentDate.toString()}, Formatted Local String: ${dateString}`);
 
 
-            // Check if this local date string is in the completion list
-            if (allCompletionDates.includes(dateString)) {
+            // Check if this day's bit is set in the month's completion bitmap
+            if ((completedBits >>> (day - 1)) & 1) {
                 console.log(`   >>> CONDITION TRUE for ${dateString}. Adding class to element with text: [${cell.textContent}]`);
                 cell.classList.add('day-completed');
                 cell.title = "Completed!";
@@ -122,18 +135,62 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    // Live updates: when this habit changes anywhere, refresh the numbers and the shown month
+    const subscribeToEvents = () => {
+        if (!window.EventSource) {
+            return;
+        }
+        const source = new EventSource('/api/events');
+        source.addEventListener('habits', (event) => {
+            const data = JSON.parse(event.data);
+            const delta = data.habits.find(habit => String(habit.id) === String(habitId));
+            if (!delta) {
+                return; // Another habit
+            }
+            if (delta.status === 'deleted') {
+                calendarGridElement.innerHTML = '<p style="color: red;">This habit has been deleted.</p>';
+                source.close();
+                return;
+            }
+            currentStreakElement.textContent = delta.current_streak || 0;
+            bestStreakElement.textContent = delta.best_streak || 0;
+            goalsMetElement.textContent = delta.goals_met || 0;
+            completionMonths.clear(); // Completions changed, drop the loaded months
+            fetchHabitStats();
+        });
+        source.addEventListener('reset', () => {
+            completionMonths.clear();
+            fetchHabitStats();
+        });
+    };
+
      // --- Event Listeners ---
      prevMonthBtn.onclick = () => {
+         currentDisplayDate.setDate(1); // Avoid skipping short months (e.g. Mar 31 -> Feb)
          currentDisplayDate.setMonth(currentDisplayDate.getMonth() - 1);
-         renderCalendar(currentDisplayDate);
+         fetchHabitStats();
      };
 
      nextMonthBtn.onclick = () => {
+         currentDisplayDate.setDate(1);
          currentDisplayDate.setMonth(currentDisplayDate.getMonth() + 1);
-         renderCalendar(currentDisplayDate);
+         fetchHabitStats();
      };
 
 
+    // Events only come from the worker process serving this stream, so also re-check
+    // when the tab becomes visible again, and now and then (a cheap 304 when unchanged)
+    const refreshHabitStats = () => {
+        if (document.visibilityState === 'visible') {
+            completionMonths.clear();
+            fetchHabitStats();
+        }
+    };
+    document.addEventListener('visibilitychange', refreshHabitStats);
+    setInterval(refreshHabitStats, CATCH_UP_INTERVAL_MS);
+
+
     // --- Initial Load ---
     fetchHabitStats();
+    subscribeToEvents();
 });
\ No newline at end of file
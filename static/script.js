@@ -1,4 +1,7 @@
 document.addEventListener('DOMContentLoaded', () => {
+    // The server resolves "today" from this timezone (also sent by EventSource, which can't set headers)
+    document.cookie = `tz=${Intl.DateTimeFormat().resolvedOptions().timeZone}; path=/; SameSite=Lax`;
+
     const pendingList = document.getElementById('pending-habits');
     const doneTodayList = document.getElementById('done-today-habits');
     const doneThisWeekList = document.getElementById('done-this-week-habits');
@@ -16,8 +19,25 @@ document.addEventListener('DOMContentLoaded', () => {
     const closeModalBtn = modal.querySelector('.close-btn');
     const addHabitForm = document.getElementById('add-habit-form');
 
+    // --- State ---
+    // Client-side copy of the habit list: id -> {habit, status}. Write responses and
+    // the changes feed patch it, so a click never reloads the whole list.
+    const habitsById = new Map();
+    let dataVersion = null; // Server data version the state corresponds to
+    let loadedDay = null; // Local date the status buckets were computed for
+    const CATCH_UP_INTERVAL_MS = 60000; // Polling fallback for changes live events don't deliver
+
+    const STATUS_LISTS = {
+        pending: () => [pendingList, pendingSection, 'pending'],
+        done_today: () => [doneTodayList, doneTodaySection, 'done-today'],
+        done_this_week: () => [doneThisWeekList, doneThisWeekSection, 'done-this-week'],
+        not_applicable_today: () => [notApplicableList, notApplicableSection, 'not-applicable'],
+    };
+
     // --- Functions ---
 
+    const localDay = () => new Date().toDateString();
+
     const fetchHabits = async () => {
         try {
             const response = await fetch('/api/habits');
@@ -26,32 +46,81 @@ document.addEventListener('DOMContentLoaded', () => {
             }
             const data = await response.json();
 
-            // Clear existing lists
-            pendingList.innerHTML = '';
-            doneTodayList.innerHTML = '';
-            doneThisWeekList.innerHTML = '';
-            notApplicableList.innerHTML = '';
-
+            // Replace the whole state with the server's list
+            habitsById.clear();
+            Object.keys(STATUS_LISTS).forEach(status => {
+                (data[status] || []).forEach(habit => habitsById.set(habit.id, { habit, status }));
+            });
+            dataVersion = data.version;
+            loadedDay = localDay();
+            renderHabits();
 
-            // Populate lists
-            populateList(pendingList, data.pending || [], 'pending');
-            populateList(doneTodayList, data.done_today || [], 'done-today');
-            populateList(doneThisWeekList, data.done_this_week || [], 'done-this-week');
-            populateList(notApplicableList, data.not_applicable_today || [], 'not-applicable');
+        } catch (error) {
+            console.error("Failed to fetch habits:", error);
+            // Display error to user?
+        }
+    };
 
-            // Show/hide sections based on content
-            pendingSection.style.display = (data.pending && data.pending.length > 0) ? 'block' : 'none';
-            doneTodaySection.style.display = (data.done_today && data.done_today.length > 0) ? 'block' : 'none';
-            doneThisWeekSection.style.display = (data.done_this_week && data.done_this_week.length > 0) ? 'block' : 'none';
-            notApplicableSection.style.display = (data.not_applicable_today && data.not_applicable_today.length > 0) ? 'block' : 'none';
+    // Apply one habit delta ({id, status, ...}) from a write response or the changes feed
+    const applyHabitDelta = (delta) => {
+        if (delta.status === 'deleted') {
+            habitsById.delete(delta.id);
+        } else {
+            habitsById.set(delta.id, { habit: delta, status: delta.status });
+        }
+    };
 
+    const applyVersion = (version) => {
+        if (version === undefined || dataVersion === null) {
+            return;
+        }
+        if (version === dataVersion + 1) {
+            dataVersion = version; // Only our own write happened
+        } else if (version > dataVersion) {
+            fetchChanges(); // Other writes happened in between, catch up on them too
+        }
+    };
 
+    // Pull what changed since our version (e.g. from another tab or machine)
+    const fetchChanges = async () => {
+        if (dataVersion === null) {
+            return fetchHabits();
+        }
+        try {
+            const response = await fetch(`/api/habits/changes?since=${dataVersion}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const data = await response.json();
+            if (data.reset) {
+                return fetchHabits(); // Too far behind, reload everything
+            }
+            if (data.changes.length > 0) {
+                data.changes.forEach(applyHabitDelta);
+                renderHabits();
+            }
+            dataVersion = data.version;
         } catch (error) {
-            console.error("Failed to fetch habits:", error);
-            // Display error to user?
+            console.error("Failed to fetch habit changes:", error);
         }
     };
 
+    const renderHabits = () => {
+        // Newest first, like the server's listing
+        const habits = [...habitsById.values()].sort((a, b) => b.habit.id - a.habit.id);
+
+        Object.entries(STATUS_LISTS).forEach(([status, lookup]) => {
+            const [listElement, sectionElement, cssStatus] = lookup();
+            const inStatus = habits.filter(entry => entry.status === status).map(entry => entry.habit);
+
+            listElement.innerHTML = '';
+            populateList(listElement, inStatus, cssStatus);
+
+            // Show/hide sections based on content
+            sectionElement.style.display = inStatus.length > 0 ? 'block' : 'none';
+        });
+    };
+
     const createHabitElement = (habit, status) => {
         const clone = habitItemTemplate.content.cloneNode(true);
         const listItem = clone.querySelector('.habit-item');
@@ -120,9 +189,16 @@ document.addEventListener('DOMContentLoaded', () => {
                  alert(`Error: ${errorData.message || 'Could not complete habit.'}`);
                 return;
             }
-            // On success, refresh the list to show the item moved
+            // On success, move the item using the habit's new status from the response
              console.log(`Habit ${habitId} marked complete.`);
-            fetchHabits();
+            const data = await response.json();
+            if (data.habit) {
+                applyHabitDelta(data.habit);
+                applyVersion(data.version);
+                renderHabits();
+            } else {
+                fetchChanges(); // e.g. already completed elsewhere
+            }
         } catch (error) {
             console.error("Error completing habit:", error);
              alert('An error occurred while completing the habit.');
@@ -145,11 +221,12 @@ document.addEventListener('DOMContentLoaded', () => {
                  alert(`Error: ${errorData.message || 'Could not delete habit.'}`);
                  return;
             }
-            // On success, remove the item visually or refresh the list
+            // On success, drop it from the state and re-render
              console.log(`Habit ${habitId} deleted.`);
-            listItem.remove(); // Optimistic UI update
-             // Or uncomment below to refresh entire list from server
-             // fetchHabits();
+            const data = await response.json();
+            applyHabitDelta(data.habit || { id: habitId, status: 'deleted' });
+            applyVersion(data.version);
+            renderHabits();
         } catch (error) {
             console.error("Error deleting habit:", error);
             alert('An error occurred while deleting the habit.');
@@ -209,10 +286,13 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
-            // Success
+            // Success: add the new habit to the list from the response
             modal.style.display = 'none'; // Close modal
             addHabitForm.reset(); // Clear form
-            fetchHabits(); // Refresh the list
+            const data = await response.json();
+            applyHabitDelta(data.habit);
+            applyVersion(data.version);
+            renderHabits();
 
         } catch (error) {
             console.error("Error adding habit:", error);
@@ -221,6 +301,41 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 
 
+    // Live updates pushed by the server (other tabs/machines), instead of refetching
+    const subscribeToEvents = () => {
+        if (!window.EventSource) {
+            return;
+        }
+        const source = new EventSource('/api/events');
+        source.addEventListener('habits', (event) => {
+            const data = JSON.parse(event.data);
+            data.habits.forEach(applyHabitDelta);
+            renderHabits();
+            applyVersion(data.version);
+        });
+        // Server couldn't replay what we missed while disconnected
+        source.addEventListener('reset', () => fetchHabits());
+    };
+
+    // Events only come from the worker process serving this stream (and not at all
+    // without SSE or when the server is at its stream limit), so also catch up with
+    // the changes feed when the tab becomes visible again, and now and then. Once the
+    // local day has rolled over every status bucket is stale, so reload instead.
+    const catchUp = () => {
+        if (document.visibilityState !== 'visible') {
+            return;
+        }
+        if (loadedDay !== null && loadedDay !== localDay()) {
+            fetchHabits();
+        } else {
+            fetchChanges();
+        }
+    };
+    subscribeToEvents();
+    document.addEventListener('visibilitychange', catchUp);
+    setInterval(catchUp, CATCH_UP_INTERVAL_MS);
+
+
     // --- Initial Load ---
     fetchHabits();
 });
\ No newline at end of file
@@ -0,0 +1,48 @@
+# tests/test_analytics.py
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from analytics import compute_analytics, due_matrix
+
+START = date(2026, 9, 19) # A 30-day window ending on TODAY
+TODAY = date(2026, 10, 18)
+DAYS = (TODAY - START).days + 1
+
+
+def completions(*days_ago, habits=1):
+    matrix = np.zeros((habits, DAYS), dtype=np.uint8)
+    for d in days_ago:
+        matrix[0, DAYS - 1 - d] = 1
+    return matrix
+
+
+def test_days_before_creation_owe_nothing():
+    due = due_matrix(['daily_all', 'weekly'], START, DAYS, first_days=[DAYS - 1, 0])
+    assert due[0].sum() == 1 # Only today
+    assert due[1].sum() == pytest.approx(DAYS / 7)
+
+
+def test_habit_created_and_done_today_is_fully_on_track():
+    result = compute_analytics(completions(0), ['daily_all'], START, window=30, created_on=[TODAY])
+    assert result["completion_rate"] == [1.0]
+    assert result["rolling_rate"]["current"] == [1.0]
+
+
+def test_rates_count_from_creation():
+    # Created 10 days ago, done on 5 of those days
+    result = compute_analytics(completions(0, 2, 4, 6, 8), ['daily_all'], START, window=30,
+                               created_on=[TODAY - timedelta(days=9)])
+    assert result["completion_rate"] == [0.5]
+
+
+def test_backfilled_days_before_creation_count_as_due():
+    # Created today with 4 backfilled days before it, one of them missed
+    result = compute_analytics(completions(0, 1, 3, 4), ['daily_all'], START, window=30, created_on=[TODAY])
+    assert result["completion_rate"] == [0.8]
+
+
+def test_without_creation_dates_the_whole_window_is_due():
+    result = compute_analytics(completions(0), ['daily_all'], START, window=30)
+    assert result["completion_rate"] == [round(1 / DAYS, 4)]
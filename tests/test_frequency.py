@@ -0,0 +1,141 @@
+# tests/test_frequency.py
+"""compute_streaks against the original calculate_streaks logic.
+
+baseline_streaks() below is the pre-rewrite services.calculate_streaks with the
+database reads taken out, kept as a reference oracle. On daily_all habits the two
+must agree on every history. They are not compared on the other frequencies,
+where the old code was wrong:
+
+- daily_weekdays, best streak: a weekend completion broke the run it sat in
+  (the Monday after was compared with Saturday/Sunday, not Friday).
+- daily_weekdays, current streak: on Saturday, Sunday and Monday the streak only
+  counted if "yesterday" (a weekend day) was completed, so Friday's run read 0.
+- weekly: treated as daily, so one completion per week never made a streak.
+
+The expected behaviour in those cases is pinned by the example tests further down.
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from frequency import FREQUENCY_RULES, compute_streaks
+
+HISTORIES = 20000
+
+
+def baseline_streaks(completion_dates, frequency_type, today):
+    """Original calculate_streaks (O(n^2)), on a list of dates instead of HabitEntry rows."""
+    if not completion_dates:
+        return {"current_streak": 0, "best_streak": 0}
+    completion_dates = sorted(completion_dates)
+
+    decrement = lambda d: d - timedelta(days=1)
+    if frequency_type == 'daily_weekdays':
+        is_valid_day = lambda d: d.weekday() < 5
+    else:
+        is_valid_day = lambda d: True
+
+    current_streak = 0
+    temp_streak = 0
+    yesterday = today - timedelta(days=1)
+    initial_check_date = None
+    if today in completion_dates and is_valid_day(today):
+        initial_check_date = today
+    elif yesterday in completion_dates and is_valid_day(yesterday):
+        initial_check_date = yesterday
+
+    if initial_check_date:
+        check_date = initial_check_date
+        while True:
+            if is_valid_day(check_date):
+                if check_date in completion_dates:
+                    temp_streak += 1
+                else:
+                    break
+            check_date = decrement(check_date)
+            if check_date < completion_dates[0] - timedelta(days=1):
+                break
+        current_streak = temp_streak
+
+    best_run = 0
+    current_run = 0
+    sorted_dates = sorted(set(completion_dates))
+    for i, current_date in enumerate(sorted_dates):
+        if not is_valid_day(current_date):
+            continue
+        if i == 0:
+            current_run = 1
+        else:
+            prev_date_in_list = sorted_dates[i - 1]
+            expected_prev_date = current_date
+            while True:
+                expected_prev_date = decrement(expected_prev_date)
+                if is_valid_day(expected_prev_date):
+                    break
+                if expected_prev_date < sorted_dates[0] - timedelta(days=1):
+                    break
+            if prev_date_in_list == expected_prev_date:
+                current_run += 1
+            else:
+                best_run = max(best_run, current_run)
+                current_run = 1
+        best_run = max(best_run, current_run)
+
+    return {"current_streak": current_streak, "best_streak": best_run}
+
+
+def random_history(rng: random.Random):
+    """(sorted completion dates, today): a random span, density and distance to today."""
+    start = date(2020, 1, 1) + timedelta(days=rng.randrange(2000))
+    length = rng.randrange(1, 120)
+    density = rng.random()
+    dates = [start + timedelta(days=i) for i in range(length) if rng.random() < density]
+    end = dates[-1] if dates else start
+    today = end + timedelta(days=rng.choice((0, 0, 1, 1, 2, 3, 10)))
+    return dates, today
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_daily_all_matches_baseline(seed):
+    rng = random.Random(seed)
+    rule = FREQUENCY_RULES['daily_all']
+    for _ in range(HISTORIES // 4):
+        dates, today = random_history(rng)
+        assert compute_streaks(dates, rule, today) == baseline_streaks(dates, 'daily_all', today), (dates, today)
+
+
+def test_duplicate_dates_count_once():
+    rule = FREQUENCY_RULES['daily_all']
+    day = date(2026, 10, 14)
+    dates = [day - timedelta(days=1), day, day]
+    assert compute_streaks(dates, rule, day) == {"current_streak": 2, "best_streak": 2}
+
+
+# --- Where the rules intentionally differ from the baseline ---
+
+FRIDAY = date(2026, 10, 16)
+
+
+@pytest.mark.parametrize("today", [FRIDAY + timedelta(days=1), FRIDAY + timedelta(days=2), FRIDAY + timedelta(days=3)])
+def test_weekdays_streak_survives_the_weekend(today):
+    rule = FREQUENCY_RULES['daily_weekdays']
+    dates = [FRIDAY - timedelta(days=i) for i in range(4, -1, -1)] # Monday to Friday
+    assert compute_streaks(dates, rule, today)["current_streak"] == 5
+
+
+def test_weekdays_weekend_completion_doesnt_break_run():
+    rule = FREQUENCY_RULES['daily_weekdays']
+    dates = [FRIDAY, FRIDAY + timedelta(days=1), FRIDAY + timedelta(days=3)] # Friday, Saturday, Monday
+    assert compute_streaks(dates, rule, FRIDAY + timedelta(days=3)) == {"current_streak": 2, "best_streak": 2}
+
+
+def test_weekly_counts_iso_weeks():
+    rule = FREQUENCY_RULES['weekly']
+    monday = date(2026, 10, 12)
+    dates = [monday - timedelta(days=10), monday - timedelta(days=4), monday + timedelta(days=2)] # Three weeks in a row
+    assert compute_streaks(dates, rule, monday + timedelta(days=6)) == {"current_streak": 3, "best_streak": 3}
+    # Still current during the following week, broken once a whole week is missed
+    assert compute_streaks(dates, rule, monday + timedelta(days=13))["current_streak"] == 3
+    assert compute_streaks(dates, rule, monday + timedelta(days=14))["current_streak"] == 0
@@ -0,0 +1,161 @@
+# tests/test_isolation.py
+"""Per-user isolation: nothing of another user's habits can be read or written.
+
+Another user's habit must look exactly like one that doesn't exist (404), the
+listings, feeds and exports must only ever contain the caller's rows, and the
+API must not answer without a token.
+"""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+DAY = date(2026, 10, 1)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'isolation.db'}")
+    from app import create_app
+    from models import db, Habit
+    from services import insert_completions, rebuild_all_stats, bump_data_version
+    from clock import local_today
+    import auth
+
+    app = create_app({"RESPONSE_CACHE_SIZE": 0, "TIMEZONE": "UTC"})
+    with app.app_context():
+        db.create_all()
+        for name in ("alice", "bob"):
+            user = auth.create_user(name)
+            habits = [Habit(user_id=user.id, name=f"{name} {frequency}", frequency_type=frequency,
+                            created_at=datetime(2026, 9, 1)) for frequency in ("daily_all", "weekly")]
+            db.session.add_all(habits)
+            db.session.flush()
+            insert_completions({(habit.id, DAY - timedelta(days=i)) for habit in habits for i in range(3)})
+            bump_data_version(user.id, [habit.id for habit in habits])
+            app.config[f"{name.upper()}_ID"] = user.id
+            app.config[f"{name.upper()}_HABITS"] = [habit.id for habit in habits]
+            app.config[f"{name.upper()}_TOKEN"] = auth.create_token(user.id)
+        insert_completions({(app.config["BOB_HABITS"][0], local_today())}) # Something for alice to try to uncomplete
+        rebuild_all_stats()
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def as_user(app, name):
+    return {"Authorization": f"Bearer {app.config[f'{name.upper()}_TOKEN']}"}
+
+
+def bob_habit(app):
+    return app.config["BOB_HABITS"][0]
+
+
+def bob_entries(app):
+    from models import db, HabitEntry
+    from clock import local_today
+    with app.app_context():
+        days = set(db.session.scalars(db.select(HabitEntry.completion_date).where(HabitEntry.habit_id == bob_habit(app))))
+        return days, {DAY - timedelta(days=i) for i in range(3)} | {local_today()}
+
+
+@pytest.mark.parametrize("method, url", [
+    ("post", "/api/habits/{id}/complete"),
+    ("post", "/api/habits/{id}/uncomplete"),
+    ("get", "/api/habits/{id}/stats"),
+    ("delete", "/api/habits/{id}"),
+    ("get", "/habit/{id}"),
+])
+def test_other_users_habit_is_not_found(app, method, url):
+    client = app.test_client()
+    response = getattr(client, method)(url.format(id=bob_habit(app)), headers=as_user(app, "alice"))
+    assert response.status_code == 404
+
+    # And nothing of bob's changed
+    from models import db, Habit
+    with app.app_context():
+        assert not db.session.get(Habit, bob_habit(app)).is_deleted
+    days, expected = bob_entries(app)
+    assert days == expected
+
+
+def listed_ids(data):
+    return {habit["id"] for key, habits in data.items() if isinstance(habits, list) for habit in habits}
+
+
+def test_listing_and_changes_only_show_own_habits(app):
+    client = app.test_client()
+    alice = set(app.config["ALICE_HABITS"])
+
+    listing = client.get("/api/habits", headers=as_user(app, "alice")).get_json()
+    assert listed_ids(listing) == alice
+
+    changes = client.get("/api/habits/changes?since=0", headers=as_user(app, "alice")).get_json()
+    assert {habit["id"] for habit in changes["changes"]} <= alice
+
+    # Bob's writes don't show up in alice's feed
+    client.post(f"/api/habits/{app.config['BOB_HABITS'][1]}/complete", headers=as_user(app, "bob"))
+    changes = client.get(f"/api/habits/changes?since={listing['version']}", headers=as_user(app, "alice")).get_json()
+    assert changes["changes"] == [] and changes["version"] == listing["version"]
+
+
+@pytest.mark.parametrize("kind", ["habits", "completions"])
+def test_export_only_contains_own_rows(app, kind):
+    response = app.test_client().get(f"/api/export/{kind}.jsonl", headers=as_user(app, "alice"))
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert records
+    key = "id" if kind == "habits" else "habit_id"
+    assert {record[key] for record in records} <= set(app.config["ALICE_HABITS"])
+
+
+def test_bulk_completions_of_other_users_habits_are_not_found(app):
+    response = app.test_client().post("/api/completions", headers=as_user(app, "alice"), json={
+        "completions": [{"habit_id": bob_habit(app), "date": DAY.isoformat()},
+                        {"habit_id": bob_habit(app), "date": (DAY + timedelta(days=1)).isoformat()}]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["created"] == 0 and data["habits"] == []
+    assert {result["status"] for result in data["results"]} == {"not_found"}
+
+    days, expected = bob_entries(app)
+    assert days == expected
+
+
+def test_events_only_reach_the_writers_subscribers(app):
+    from app import get_broadcaster
+    with app.app_context():
+        broadcaster = get_broadcaster()
+        alice = broadcaster.subscribe(app.config["ALICE_ID"])
+        bob = broadcaster.subscribe(app.config["BOB_ID"])
+    try:
+        response = app.test_client().post(f"/api/habits/{app.config['BOB_HABITS'][1]}/complete",
+                                          headers=as_user(app, "bob"))
+        assert response.status_code == 201
+        assert alice.queue.empty()
+        assert not bob.queue.empty()
+    finally:
+        broadcaster.unsubscribe(alice)
+        broadcaster.unsubscribe(bob)
+
+
+@pytest.mark.parametrize("method, url", [
+    ("get", "/api/habits"),
+    ("post", "/api/habits"),
+    ("get", "/api/habits/changes?since=0"),
+    ("get", "/api/events"),
+    ("post", "/api/habits/1/complete"),
+    ("post", "/api/habits/1/uncomplete"),
+    ("get", "/api/habits/1/stats"),
+    ("delete", "/api/habits/1"),
+    ("post", "/api/completions"),
+    ("get", "/api/export/habits.jsonl"),
+    ("post", "/api/import/habits.jsonl"),
+])
+def test_api_requires_a_token(app, method, url):
+    client = app.test_client()
+    assert getattr(client, method)(url).status_code == 401
+    assert getattr(client, method)(url, headers={"Authorization": "Bearer not-a-token"}).status_code == 401
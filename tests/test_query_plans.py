@@ -0,0 +1,108 @@
+# tests/test_query_plans.py
+"""EXPLAIN QUERY PLAN checks for the hot read endpoints, on a small fixture database.
+
+The listing (statuses for today), the stats endpoint and the changes feed must
+reach habits through ix_habit_user_active_created, entries through the
+_habit_date_uc index (which SQLite names sqlite_autoindex_habit_entry_1), and
+never scan a whole table.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+FULL_SCAN = re.compile(r"^SCAN (habit|habit_entry|habit_stats|habit_change)$")
+ENTRY_INDEX = "sqlite_autoindex_habit_entry_1" # The _habit_date_uc unique constraint
+HABIT_INDEX = "ix_habit_user_active_created"
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'plans.db'}")
+    from app import create_app
+    from models import db, Habit
+    from services import insert_completions, rebuild_all_stats, bump_data_version
+    import auth
+
+    app = create_app({"RESPONSE_CACHE_SIZE": 0, "TIMEZONE": "UTC"})
+    with app.app_context():
+        db.create_all()
+        start = date(2026, 1, 1)
+        for name in ("alice", "bob"):
+            user = auth.create_user(name)
+            habits = [Habit(user_id=user.id, name=f"{name} {i}", frequency_type=frequency,
+                            created_at=datetime(2025, 12, 1))
+                      for i, frequency in enumerate(["daily_all", "daily_weekdays", "weekly"] * 10)]
+            db.session.add_all(habits)
+            db.session.flush()
+            habits[0].is_deleted = True
+            insert_completions({(habit.id, start + timedelta(days=day))
+                                for habit in habits for day in range(0, 200, 1 + habit.id % 3)})
+            bump_data_version(user.id, [habit.id for habit in habits[:3]])
+        rebuild_all_stats()
+        app.config["TEST_TOKEN"] = auth.create_token(1)
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def captured_plans(app, urls):
+    """[(statement, plan details)] of every SELECT the given GETs ran."""
+    from models import db
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    headers = {"Authorization": f"Bearer {app.config['TEST_TOKEN']}"}
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            client = app.test_client()
+            for url in urls:
+                assert client.get(url, headers=headers).status_code == 200, url
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+        with db.engine.connect() as conn:
+            return [(statement, [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement,
+                                                                          parameters).all()])
+                    for statement, parameters in captured]
+
+
+def uses(plans, index):
+    return any(index in detail for _, details in plans for detail in details)
+
+
+def assert_no_full_scans(plans):
+    scans = [(" ".join(statement.split()), details) for statement, details in plans
+             if any(FULL_SCAN.match(detail) for detail in details)]
+    assert not scans, scans
+
+
+def test_listing_plans(app):
+    plans = captured_plans(app, ["/api/habits"])
+    assert plans
+    assert_no_full_scans(plans)
+    assert uses(plans, HABIT_INDEX)
+    assert uses(plans, ENTRY_INDEX) # Today's/this week's completions
+
+
+def test_stats_plans(app):
+    plans = captured_plans(app, ["/api/habits/2/stats?month=2026-03"])
+    assert plans
+    assert_no_full_scans(plans)
+    assert uses(plans, ENTRY_INDEX) # The month's completion bitmap
+
+
+def test_changes_plans(app):
+    plans = captured_plans(app, ["/api/habits/changes?since=0"])
+    assert plans
+    assert_no_full_scans(plans)
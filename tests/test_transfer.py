@@ -0,0 +1,108 @@
+# tests/test_transfer.py
+"""Importing an export into an account whose habit ids don't match the exported ones."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+DAY = date(2026, 10, 1)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'transfer.db'}")
+    from app import create_app
+    from models import db, Habit
+    from services import insert_completions
+    import auth
+
+    app = create_app({"RESPONSE_CACHE_SIZE": 0, "TIMEZONE": "UTC"})
+    with app.app_context():
+        db.create_all()
+        # bob's habits take the ids 1-3 first, alice's are 4-5
+        for name, count in (("bob", 3), ("alice", 2)):
+            user = auth.create_user(name)
+            habits = [Habit(user_id=user.id, name=f"{name} {i}", frequency_type="daily_all",
+                            created_at=datetime(2026, 9, 1)) for i in range(count)]
+            db.session.add_all(habits)
+            db.session.flush()
+            insert_completions({(habit.id, DAY - timedelta(days=i)) for habit in habits for i in range(3)})
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def export(user_id, kind):
+    import transfer
+    return list(transfer.read_records(iter("".join(transfer.export_rows(user_id, kind, "jsonl")).splitlines()),
+                                      "jsonl"))
+
+
+def habit_entries(user_id):
+    """{habit name: completion dates} of the user."""
+    from models import db, Habit, HabitEntry
+    rows = db.session.execute(db.select(Habit.name, HabitEntry.completion_date)
+                                .join(HabitEntry, HabitEntry.habit_id == Habit.id)
+                                .where(Habit.user_id == user_id)).all()
+    entries = {}
+    for name, day in rows:
+        entries.setdefault(name, set()).add(day)
+    return entries
+
+
+def test_completions_follow_the_imported_habits(app):
+    import transfer
+    alice, bob = 2, 1
+    with app.app_context():
+        habits, completions = export(alice, "habits"), export(alice, "completions")
+        assert {record["id"] for record in habits} == {4, 5}
+
+        counts = transfer.import_habits(bob, habits)
+        assert counts["inserted"] == 2
+        counts = transfer.import_completions(bob, completions)
+        assert counts["inserted"] == 6 and counts["unknown_habit"] == 0
+
+        entries = habit_entries(bob)
+        alice_days = {DAY - timedelta(days=i) for i in range(3)}
+        assert entries["alice 0"] == entries["alice 1"] == alice_days
+        assert habit_entries(alice) == {"alice 0": alice_days, "alice 1": alice_days} # Untouched
+
+
+def test_ids_taken_by_the_user_dont_capture_completions(app):
+    import transfer
+    alice = 2
+    with app.app_context():
+        # Re-importing alice's own export: every exported id is one of her live habits
+        habits, completions = export(alice, "habits"), export(alice, "completions")
+        transfer.import_habits(alice, habits)
+        completions.append({"habit_id": "4", "completion_date": (DAY + timedelta(days=1)).isoformat()})
+        counts = transfer.import_completions(alice, completions)
+        assert counts["inserted"] == 7 and counts["skipped"] == 0 # All on the new copies
+
+        from models import db, Habit
+        copy = db.session.scalars(db.select(Habit.id).where(Habit.user_id == alice, Habit.id > 5)
+                                    .order_by(Habit.id)).first()
+        assert db.session.get(Habit, copy).name == "alice 0"
+        assert DAY + timedelta(days=1) in {entry.completion_date for entry in db.session.get(Habit, copy).entries}
+        assert DAY + timedelta(days=1) not in {entry.completion_date for entry in db.session.get(Habit, 4).entries}
+
+
+def test_reimport_skips_habits_already_imported(app):
+    import transfer
+    alice, bob = 2, 1
+    with app.app_context():
+        habits = export(alice, "habits")
+        transfer.import_habits(bob, habits)
+        counts = transfer.import_habits(bob, habits)
+        assert counts["inserted"] == 0 and counts["skipped"] == 2
+
+
+def test_completions_of_ids_never_imported_are_unknown(app):
+    import transfer
+    bob = 1
+    with app.app_context():
+        # 1 is bob's own live habit, but no imported habit had that id
+        counts = transfer.import_completions(bob, [{"habit_id": "1", "completion_date": DAY.isoformat()}])
+        assert counts["unknown_habit"] == 1 and counts["inserted"] == 0
@@ -0,0 +1,255 @@
+# transfer.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from models import db, Habit, HabitEntry, ImportedHabit
+from frequency import FREQUENCY_RULES
+from services import insert_completions, rebuild_habit_stats, bump_data_version
+from clock import local_today
+
+# Streaming export/import of habits and completions as CSV or JSON Lines. Exports
+# read with server-side cursors (yield_per) and yield text in chunks; imports
+# parse one record at a time and write in batches, so memory stays flat at any size.
+
+FORMATS = ('csv', 'jsonl')
+
+# kind -> exported columns, in order
+FIELDS = {
+    "habits": ("id", "name", "frequency_type", "created_at", "is_deleted"),
+    "completions": ("habit_id", "completion_date", "timestamp"),
+}
+
+EXPORT_CHUNK_ROWS = 1000 # Rows fetched per cursor round trip and written per chunk
+IMPORT_BATCH_SIZE = 1000 # Records per upsert (and per commit)
+
+
+def _export_query(user_id: int, kind: str):
+    habits = Habit.__table__
+    if kind == "habits":
+        return (db.select(*(habits.c[name] for name in FIELDS[kind]))
+                  .where(habits.c.user_id == user_id).order_by(habits.c.id))
+    table = HabitEntry.__table__
+    # The user's habits, then each one's entries through the _habit_date_uc index
+    return (db.select(*(table.c[name] for name in FIELDS[kind]))
+              .join(habits, habits.c.id == table.c.habit_id)
+              .where(habits.c.user_id == user_id)
+              .order_by(table.c.habit_id, table.c.completion_date))
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_rows(user_id: int, kind: str, fmt: str, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yields the user's `kind` ('habits' or 'completions') as text chunks of up to chunk_rows rows.
+
+    Needs an app context for as long as it is iterated.
+    """
+    fields = FIELDS[kind]
+    result = db.session.execute(_export_query(user_id, kind).execution_options(yield_per=chunk_rows))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if fmt == "csv" else None
+    if writer:
+        writer.writerow(fields)
+
+    for rows in result.partitions():
+        for row in rows:
+            if writer:
+                writer.writerow([_json_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(fields, map(_json_value, row))), ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue() # CSV header of an empty export
+
+
+def read_records(stream, fmt: str):
+    """Parses a text stream of CSV (with a header row) or JSON Lines into dicts, one at a time."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None # Counted as invalid by the importer
+            yield record if isinstance(record, dict) else {}
+
+
+def _batches(records, size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _parse_habit(record):
+    """Habit column values (plus the record's "source_id", if any) from an import record, or None when it is invalid."""
+    name = record.get("name") or ""
+    frequency_type = record.get("frequency_type")
+    # JSON Lines values can be of any type
+    if not isinstance(name, str) or not isinstance(frequency_type, str):
+        return None
+    name = name.strip()
+    if not name or frequency_type not in FREQUENCY_RULES:
+        return None
+    try:
+        values = {"name": name, "frequency_type": frequency_type,
+                  "is_deleted": _parse_bool(record.get("is_deleted") or False)}
+        if record.get("id") not in (None, ""):
+            values["source_id"] = int(record["id"])
+        if record.get("created_at"):
+            values["created_at"] = datetime.fromisoformat(record["created_at"])
+    except (TypeError, ValueError):
+        return None
+    return values
+
+
+def import_habits(user_id: int, records, batch_size: int = IMPORT_BATCH_SIZE, progress=None):
+    """Imports habit records for the user in batches, each as a new habit with a new id.
+
+    The record's id is kept in ImportedHabit as the source id of the new habit,
+    which is how import_completions() finds it; records whose id the user has
+    already imported are skipped, so an import can be re-run. Returns counts of read/inserted/skipped/invalid records; progress(counts) is
+    called after every committed batch. If reading the records fails midway, the
+    committed batches are finished (stats, data version) before the error propagates.
+    """
+    counts = {"read": 0, "inserted": 0, "skipped": 0, "invalid": 0}
+    inserted_ids = []
+    try:
+        _import_habit_batches(user_id, records, batch_size, progress, counts, inserted_ids)
+    finally:
+        db.session.rollback() # A batch cut short by the error; committed ones stay
+        _finish_import(user_id, inserted_ids)
+    return counts
+
+
+def _import_habit_batches(user_id, records, batch_size, progress, counts, inserted_ids):
+    table = Habit.__table__
+    for batch in _batches(records, batch_size):
+        counts["read"] += len(batch)
+        rows = []
+        for record in batch:
+            values = _parse_habit(record)
+            if values is None:
+                counts["invalid"] += 1
+            else:
+                values["user_id"] = user_id
+                rows.append(values)
+
+        source_ids = [row["source_id"] for row in rows if "source_id" in row]
+        imported = set(db.session.scalars(
+            db.select(ImportedHabit.source_id)
+              .where(ImportedHabit.user_id == user_id, ImportedHabit.source_id.in_(source_ids))
+        )) if source_ids else set()
+        new_rows = []
+        for row in rows:
+            if "source_id" in row:
+                if row["source_id"] in imported:
+                    continue
+                imported.add(row["source_id"]) # Repeated ids in the file count as skipped too
+            new_rows.append(row)
+        counts["skipped"] += len(rows) - len(new_rows)
+
+        batch_ids, mappings = [], []
+        for row in new_rows:
+            source_id = row.pop("source_id", None)
+            # One at a time, for each new id
+            habit_id = db.session.execute(table.insert().values(**row)).inserted_primary_key[0]
+            batch_ids.append(habit_id)
+            if source_id is not None:
+                mappings.append({"user_id": user_id, "source_id": source_id, "habit_id": habit_id})
+        if mappings:
+            db.session.execute(ImportedHabit.__table__.insert(), mappings)
+        counts["inserted"] += len(new_rows)
+        db.session.commit()
+        inserted_ids.extend(batch_ids)
+        if progress:
+            progress(counts)
+
+
+def import_completions(user_id: int, records, batch_size: int = IMPORT_BATCH_SIZE, progress=None):
+    """Imports completion records (habit_id, completion_date) of the user's imported habits with batched upserts.
+
+    habit_id is the habit's id in the exported file; it is resolved through the
+    habits import_habits() created from it, never matched against live ids. Existing (habit_id, completion_date) pairs are skipped by the _habit_date_uc
+    conflict clause, so re-running an import is harmless. Returns counts of
+    read/inserted/skipped/invalid (also days after today)/unknown_habit records; progress(counts) is called
+    after every committed batch. Stats of the touched habits are rebuilt at the end,
+    also when reading the records fails midway.
+    """
+    counts = {"read": 0, "inserted": 0, "skipped": 0, "invalid": 0, "unknown_habit": 0}
+    touched = set()
+    try:
+        _import_completion_batches(user_id, records, batch_size, progress, counts, touched)
+    finally:
+        db.session.rollback() # A batch cut short by the error; committed ones stay
+        _finish_import(user_id, sorted(touched))
+    return counts
+
+
+def _import_completion_batches(user_id, records, batch_size, progress, counts, touched):
+    # Source id -> the user's habit it was imported as (while that habit still exists)
+    habit_ids = dict(db.session.execute(
+        db.select(ImportedHabit.source_id, ImportedHabit.habit_id)
+          .join(Habit, Habit.id == ImportedHabit.habit_id)
+          .where(ImportedHabit.user_id == user_id, Habit.user_id == user_id)
+    ).all())
+    today = local_today()
+    for batch in _batches(records, batch_size):
+        counts["read"] += len(batch)
+        pairs = set()
+        valid = 0
+        for record in batch:
+            try:
+                source_id = int(record["habit_id"])
+                completion_date = date.fromisoformat(record.get("completion_date") or record["date"])
+                if completion_date > today:
+                    raise ValueError("future date") # Same rule as bulk completions
+            except (KeyError, TypeError, ValueError):
+                counts["invalid"] += 1
+                continue
+            habit_id = habit_ids.get(source_id)
+            if habit_id is None:
+                counts["unknown_habit"] += 1
+                continue
+            valid += 1
+            pairs.add((habit_id, completion_date))
+
+        inserted = insert_completions(pairs)
+        counts["inserted"] += len(inserted)
+        counts["skipped"] += valid - len(inserted) # Already recorded, or repeated in the file
+        db.session.commit()
+        touched.update(habit_id for habit_id, _ in inserted)
+        if progress:
+            progress(counts)
+
+
+def _finish_import(user_id: int, habit_ids):
+    """Rebuilds the stats rows of the imported habits and bumps the user's data version."""
+    if not habit_ids:
+        return
+    for start in range(0, len(habit_ids), 500):
+        for habit in Habit.query.filter(Habit.id.in_(habit_ids[start:start + 500])).all():
+            rebuild_habit_stats(habit)
+    bump_data_version(user_id, None) # Clients reload everything
+    db.session.commit()
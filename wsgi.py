@@ -0,0 +1,10 @@
+# wsgi.py
+"""WSGI entry point for production servers:
+
+    python manage.py upgrade-db   # once per deploy: creates/updates the schema
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()